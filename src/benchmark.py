@@ -0,0 +1,257 @@
+from main import SOLITARIOS, armar_juego, recuperar, reproducir, jugar
+from mesa import *
+from mazo import crear_mazo
+import argparse, contextlib, json, math, os, platform, random, statistics, sys, time, timeit
+
+# Casos de benchmark del motor: micro (una operación de las pilas, la mesa o
+# los mazos) y macro (partidas enteras). Cada caso se calienta, se calibra
+# para que una repetición tarde al menos TIEMPO_MINIMO y se repite; se
+# guarda el tiempo por llamada de cada repetición. Con --base se compara
+# contra un JSON guardado antes y se marcan los casos que cambiaron más que
+# TOLERANCIA con diferencia significativa (t de Welch mayor que UMBRAL_T).
+REPETICIONES = 7
+CALENTAMIENTO = 1
+TIEMPO_MINIMO = 0.05
+TOLERANCIA = 0.05
+UMBRAL_T = 3.0
+
+DISPOSICIONES = ((1, 4), (1, 2), (1, 1), (2, 4), (2, 1))
+LOGS = ('solitario.log', 'solitario_eliminador.log', 'solitario_reyerta.log')
+REPARTO = '#1'
+JUGADAS_GUION = 300
+SEMILLAS_PLAYOUT = range(4)
+
+_DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def _crear_mazo(mazos, palos):
+    azar = random.Random(0)
+    return lambda: crear_mazo(mazos, palos, azar)
+
+
+def _mezclar():
+    azar = random.Random(0)
+    mazo = crear_mazo(2, 4, azar)
+    return lambda: mazo.mezclar(azar)
+
+
+def _criterio():
+    comp = criterio(palo=DISTINTO_COLOR, orden=DESCENDENTE)
+    codigos = [codificar(valor, palo) for palo in range(4) for valor in range(1, 14)]
+    pares = [(a, b) for a in codigos for b in codigos]
+
+    def comparar():
+        for a, b in pares:
+            comp(a, b)
+    return comparar
+
+
+def _pila_spider(base):
+    """Devuelve una pila de tablero de Spider con base cartas boca abajo y
+    una K boca arriba encima."""
+    pila = PilaCartas(pila_visible=True, criterio_apilar=criterio(orden=DESCENDENTE),
+                      criterio_mover=criterio(orden=ASCENDENTE))
+    pila.apilar_varios([Carta(valor, PICAS) for valor in range(1, base + 1)])
+    pila.apilar(Carta(13, PICAS, False), forzar=True)
+    return pila
+
+
+def _mover():
+    # Las Q a A van y vienen entre las dos pilas: cada mover() busca dónde
+    # cortar la secuencia y pasa 12 cartas.
+    a = _pila_spider(5)
+    b = _pila_spider(4)
+    a.apilar_varios([Carta(valor, PICAS, False) for valor in range(12, 0, -1)])
+
+    def mover():
+        b.mover(a)
+        a.mover(b)
+    return mover
+
+
+def _str_pila():
+    pila = _pila_spider(5)
+    pila.apilar_varios([Carta(valor, PICAS, False) for valor in range(12, 0, -1)])
+    return lambda: str(pila)
+
+
+def _parsear_jugada():
+    mesa, solitario = _armar('Spider', REPARTO)
+    comandos = ['A', 'AB', 'J1', 'M', 'Z', 'Y', '$', 'XX', 'A12']
+
+    def parsear():
+        for comando in comandos:
+            mesa.parsear_jugada(comando)
+    return parsear
+
+
+def _armar(juego, seed):
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        return armar_juego(juego, seed)
+
+
+def _guion(juego):
+    """Arma el reparto REPARTO del juego y lo juega con la política codiciosa
+    de simulacion (con su semilla) para grabar las jugadas. El caso mide
+    armarlo y repetir esas jugadas."""
+    from simulacion import _elegir_codiciosa
+    mesa, solitario = _armar(juego, REPARTO)
+    azar = random.Random(0)
+    guion = []
+    anterior = None
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        while not solitario.termino() and len(guion) < JUGADAS_GUION:
+            movimientos = solitario.movimientos()
+            if not movimientos:
+                break
+            anterior = _elegir_codiciosa(movimientos, anterior, azar)
+            solitario.jugar(anterior)
+            guion.append(anterior)
+
+    def jugar_guion():
+        mesa, solitario = _armar(juego, REPARTO)
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            for jugada in guion:
+                jugar(solitario, jugada)
+    return jugar_guion
+
+
+def _log(archivo):
+    seed, juego, comandos = recuperar(os.path.join(_DIRECTORIO, archivo))
+
+    def reproducir_log():
+        mesa, solitario = _armar(juego, seed)
+        reproducir(mesa, solitario, comandos)
+    return reproducir_log
+
+
+def _playouts(juego):
+    from simulacion import jugar_partida
+    return lambda: [jugar_partida(juego, semilla) for semilla in SEMILLAS_PLAYOUT]
+
+
+def casos():
+    """Devuelve la lista de (nombre, tipo, preparar) de los casos. preparar()
+    arma lo que haga falta (sin medirlo) y devuelve la función a medir."""
+    lista = [('crear_mazo {}x{}'.format(mazos, palos), 'micro', lambda m=mazos, p=palos: _crear_mazo(m, p))
+             for mazos, palos in DISPOSICIONES]
+    lista += [
+        ('PilaCartas.mezclar', 'micro', _mezclar),
+        ('criterio', 'micro', _criterio),
+        ('PilaCartas.mover spider', 'micro', _mover),
+        ('PilaCartas.__str__', 'micro', _str_pila),
+        ('Mesa.parsear_jugada', 'micro', _parsear_jugada),
+    ]
+    juegos = sorted(SOLITARIOS.keys())
+    lista += [('guion ' + juego, 'macro', lambda j=juego: _guion(j)) for juego in juegos]
+    lista += [('log ' + archivo, 'macro', lambda a=archivo: _log(a))
+              for archivo in LOGS if os.path.exists(os.path.join(_DIRECTORIO, archivo))]
+    lista += [('playouts ' + juego, 'macro', lambda j=juego: _playouts(j)) for juego in juegos]
+    return lista
+
+
+def medir(funcion, repeticiones=REPETICIONES, calentamiento=CALENTAMIENTO):
+    """Mide funcion: la llama calentamiento veces, calibra cuántas llamadas
+    hacen una repetición y devuelve un dict con esa cantidad (numero) y los
+    segundos por llamada de cada repetición (muestras) y sus estadísticas."""
+    for i in range(calentamiento):
+        funcion()
+    temporizador = timeit.Timer(funcion)
+    numero = 1
+    while temporizador.timeit(numero) < TIEMPO_MINIMO:
+        numero *= 2
+    muestras = [t / numero for t in temporizador.repeat(repeticiones, numero)]
+    return {'numero': numero, 'muestras': muestras, 'minimo': min(muestras),
+            'mediana': statistics.median(muestras), 'media': statistics.mean(muestras),
+            'desvio': statistics.stdev(muestras) if len(muestras) > 1 else 0.0}
+
+
+def correr(filtro=None, repeticiones=REPETICIONES, calentamiento=CALENTAMIENTO, informe=sys.stderr):
+    """Corre los casos cuyo nombre contiene filtro (todos si es None) y
+    devuelve los resultados como un dict apto para JSON."""
+    resultados = {}
+    for nombre, tipo, preparar in casos():
+        if filtro and filtro not in nombre:
+            continue
+        random.seed(0)
+        resultado = medir(preparar(), repeticiones, calentamiento)
+        resultado['tipo'] = tipo
+        resultados[nombre] = resultado
+        print('{:32} {:>12}'.format(nombre, _formatear(resultado['mediana'])), file=informe)
+    return {'python': platform.python_version(), 'plataforma': platform.platform(),
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeticiones': repeticiones,
+            'calentamiento': calentamiento, 'casos': resultados}
+
+
+def comparar(actual, base):
+    """Compara los casos de actual con los de base (dicts de correr()).
+    Devuelve una lista de (nombre, razón entre medianas, t de Welch,
+    veredicto), con veredicto 'más lento', 'más rápido' o 'igual'."""
+    comparacion = []
+    for nombre, resultado in actual['casos'].items():
+        anterior = base['casos'].get(nombre)
+        if not anterior:
+            continue
+        razon = resultado['mediana'] / anterior['mediana']
+        t = _welch(resultado['muestras'], anterior['muestras'])
+        veredicto = 'igual'
+        if abs(t) > UMBRAL_T and abs(razon - 1) > TOLERANCIA:
+            veredicto = 'más lento' if razon > 1 else 'más rápido'
+        comparacion.append((nombre, razon, t, veredicto))
+    return comparacion
+
+
+def _welch(a, b):
+    """Devuelve el estadístico t de Welch de las muestras a y b (positivo si
+    a es más lenta)."""
+    if len(a) < 2 or len(b) < 2:
+        return 0.0
+    error = math.sqrt(statistics.variance(a) / len(a) + statistics.variance(b) / len(b))
+    diferencia = statistics.mean(a) - statistics.mean(b)
+    if not error:
+        return math.copysign(math.inf, diferencia) if diferencia else 0.0
+    return diferencia / error
+
+
+def _formatear(segundos):
+    for unidad, escala in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if segundos >= escala:
+            return '{:.2f} {}'.format(segundos / escala, unidad)
+    return '{:.0f} ns'.format(segundos / 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corre los benchmarks del motor y los compara con una base guardada.")
+    parser.add_argument('--filtro', help="sólo los casos cuyo nombre contiene este texto")
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--calentamiento', type=int, default=CALENTAMIENTO)
+    parser.add_argument('--salida', help="archivo JSON donde guardar los resultados")
+    parser.add_argument('--base', help="archivo JSON de una corrida anterior con el que comparar")
+    args = parser.parse_args()
+
+    base = None
+    if args.base:
+        try:
+            with open(args.base) as f:
+                base = json.load(f)
+        except (IOError, ValueError):
+            print("ERROR: No pudo leerse la base", args.base, file=sys.stderr)
+            sys.exit(2)
+
+    actual = correr(args.filtro, args.repeticiones, args.calentamiento)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(actual, f, indent=1, sort_keys=True)
+
+    if base:
+        print(file=sys.stderr)
+        lentos = 0
+        for nombre, razon, t, veredicto in comparar(actual, base):
+            print('{:32} {:>7.3f}x  t={:>7.1f}  {}'.format(nombre, razon, t, veredicto), file=sys.stderr)
+            lentos += veredicto == 'más lento'
+        # Para usarlo en CI: falla si algún caso empeoró.
+        if lentos:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,25 @@ DESCENDENTE = 1
 CONSECUTIVA = 2
 
 
+# Codificación compacta de una carta en un entero chico:
+#   bits 0-3: valor (1 a 13), bits 4-5: palo, bit 6: boca abajo.
+# Todos los códigos posibles entran en un byte (0 a 127).
+BITS_VALOR = 0x0F
+BITS_PALO = 0x30
+BOCA_ABAJO = 0x40
+CANTIDAD_CODIGOS = 0x80
+
+
+def codificar(valor, palo, boca_abajo=False):
+    """Devuelve el código entero de una carta de un valor, palo y boca_abajo."""
+    return valor | palo << 4 | (BOCA_ABAJO if boca_abajo else 0)
+
+
+def codigo(carta):
+    """Devuelve el código de una carta, que puede ser una Carta o ya un código."""
+    return carta if carta.__class__ is int else carta.codigo
+
+
 class Carta:
     """
         Clase que representa una carta de baraja francesa.
@@ -32,27 +51,68 @@ class Carta:
             valor: Un número del 1 al 13.
             palo: Un valor entre PICAS, CORAZONES, DIAMANTES y TREBOLES.
             boca_abajo: Un bool, indica si la carta está boca abajo.
+        Internamente los tres atributos se guardan empaquetados en un único
+        entero, codigo (ver codificar()).
     """
 
+    __slots__ = ('codigo',)
+
     def __init__(self, valor, palo, boca_abajo=True):
         """Crea una carta de un valor, palo y boca_abajo. Por omisión la carta
         está boca abajo."""
-        self.valor = valor
-        self.palo = palo
-        self.boca_abajo = boca_abajo
+        self.codigo = codificar(valor, palo, boca_abajo)
+
+    @classmethod
+    def desde_codigo(cls, codigo):
+        """Crea una carta a partir de su código entero."""
+        carta = cls.__new__(cls)
+        carta.codigo = codigo
+        return carta
+
+    @property
+    def valor(self):
+        return self.codigo & BITS_VALOR
+
+    @valor.setter
+    def valor(self, valor):
+        self.codigo = self.codigo & ~BITS_VALOR | valor
+
+    @property
+    def palo(self):
+        return (self.codigo & BITS_PALO) >> 4
+
+    @palo.setter
+    def palo(self, palo):
+        self.codigo = self.codigo & ~BITS_PALO | palo << 4
+
+    @property
+    def boca_abajo(self):
+        return bool(self.codigo & BOCA_ABAJO)
+
+    @boca_abajo.setter
+    def boca_abajo(self, boca_abajo):
+        self.codigo = self.codigo & ~BOCA_ABAJO | (BOCA_ABAJO if boca_abajo else 0)
 
     def voltear(self):
         """Da vuelta una carta."""
-        self.boca_abajo = not self.boca_abajo
+        self.codigo ^= BOCA_ABAJO
 
     def __str__(self):
-        return _c2s(self.valor, self.palo) if not self.boca_abajo else _c2s(0, 0)
+        return glifos()[self.codigo]
 
     def __repr__(self):
         return str(self)
 
     def __eq__(self, other):
-        return not self.boca_abajo and self.palo == other.palo and self.valor == other.valor
+        return not self.boca_abajo and (self.codigo | BOCA_ABAJO) == (codigo(other) | BOCA_ABAJO)
+
+    def __hash__(self):
+        # Dos cartas iguales tienen igual valor y palo, sin importar boca_abajo.
+        return self.codigo & ~BOCA_ABAJO
+
+
+# Tablas de comparación ya calculadas, una por cada combinación (palo, orden).
+_TABLAS_CRITERIOS = {}
 
 
 def criterio(palo=None, orden=None):
@@ -60,52 +120,118 @@ def criterio(palo=None, orden=None):
         palo: Un valor entre MISMO_PALO, MISMO_COLOR, DISTINTO_PALO, DISTINTO_COLOR.
         orden: Un valor entre ASCENDENTE, DESCENDENTE o CONSECUTIVA.
     Devuelve una función de comparación cmp(a, b) que indica si la carta b es apilable
-    sobre la carta a según el criterio indicado."""
+    sobre la carta a según el criterio indicado. Las cartas pueden ser Cartas o
+    sus códigos enteros.
+    La función tiene un atributo tabla: una tupla de bools indexada por
+    codigo(a) << 7 | codigo(b), calculada una única vez por combinación."""
+    tabla = tabla_criterio(palo, orden)
+
     def comp(a, b):
-        if a.boca_abajo or b.boca_abajo:
-            # Las cartas tienen que estar boca arriba.
-            return False
-
-        if orden is not None:
-            # Si hay restricción de valor:
-            if orden == ASCENDENTE:
-                if a.valor + 1 != b.valor:
-                    return False
-            elif orden == DESCENDENTE:
-                if a.valor != b.valor + 1:
-                    return False
-            if orden == CONSECUTIVA:
-                if a.valor % 13 + 1 != b.valor and a.valor != b.valor % 13 + 1:
-                    return False
-
-        if palo is not None:
-            # Si hay restricción de palo:
-            if palo == MISMO_PALO:
-                if a.palo != b.palo:
-                    return False
-            elif palo == MISMO_COLOR:
-                if (a.palo in (CORAZONES, DIAMANTES) and b.palo not in (CORAZONES, DIAMANTES)) or \
-                        (a.palo in (PICAS, TREBOLES) and b.palo not in (PICAS, TREBOLES)):
-                    return False
-            elif palo == DISTINTO_PALO:
-                if a.palo == b.palo:
-                    return False
-            elif palo == DISTINTO_COLOR:
-                if (a.palo in (CORAZONES, DIAMANTES) and b.palo in (CORAZONES, DIAMANTES)) or \
-                        (a.palo in (PICAS, TREBOLES) and b.palo in (PICAS, TREBOLES)):
-                    return False
-
-        return True
+        return tabla[(a if a.__class__ is int else a.codigo) << 7 | (b if b.__class__ is int else b.codigo)]
+    comp.tabla = tabla
     return comp
 
 
+def tabla_criterio(palo=None, orden=None):
+    """Devuelve la tabla de comparación del criterio (palo, orden). Ver criterio()."""
+    clave = (palo, orden)
+    if clave not in _TABLAS_CRITERIOS:
+        cartas = [Carta.desde_codigo(c) for c in range(CANTIDAD_CODIGOS)]
+        _TABLAS_CRITERIOS[clave] = tuple(_comparar(palo, orden, a, b) for a in cartas for b in cartas)
+    return _TABLAS_CRITERIOS[clave]
+
+
+def largo_secuencia(comp, cartas):
+    """Versión en lote de una función de criterio().
+    Devuelve cuántas cartas del final de la secuencia cartas (de base a tope)
+    cumplen que cada una es apilable sobre la anterior según comp. Una carta
+    suelta boca arriba es una secuencia de largo 1.
+    Las cartas pueden ser Cartas o sus códigos enteros."""
+    codigos = [codigo(c) for c in cartas]
+    if not codigos or codigos[-1] & BOCA_ABAJO:
+        return 0
+    tabla = comp.tabla
+    i = len(codigos) - 1
+    while i > 0 and tabla[codigos[i - 1] << 7 | codigos[i]]:
+        i -= 1
+    return len(codigos) - i
+
+
+def _comparar(palo, orden, a, b):
+    """Indica si la carta b es apilable sobre la carta a según el criterio
+    (palo, orden). Se usa sólo para construir las tablas de criterio()."""
+    if (a.valor < 1 or a.valor > 13) or (b.valor < 1 or b.valor > 13):
+        # Códigos que no representan cartas.
+        return False
+
+    if a.boca_abajo or b.boca_abajo:
+        # Las cartas tienen que estar boca arriba.
+        return False
+
+    if orden is not None:
+        # Si hay restricción de valor:
+        if orden == ASCENDENTE:
+            if a.valor + 1 != b.valor:
+                return False
+        elif orden == DESCENDENTE:
+            if a.valor != b.valor + 1:
+                return False
+        if orden == CONSECUTIVA:
+            if a.valor % 13 + 1 != b.valor and a.valor != b.valor % 13 + 1:
+                return False
+
+    if palo is not None:
+        # Si hay restricción de palo:
+        if palo == MISMO_PALO:
+            if a.palo != b.palo:
+                return False
+        elif palo == MISMO_COLOR:
+            if (a.palo in (CORAZONES, DIAMANTES) and b.palo not in (CORAZONES, DIAMANTES)) or \
+                    (a.palo in (PICAS, TREBOLES) and b.palo not in (PICAS, TREBOLES)):
+                return False
+        elif palo == DISTINTO_PALO:
+            if a.palo == b.palo:
+                return False
+        elif palo == DISTINTO_COLOR:
+            if (a.palo in (CORAZONES, DIAMANTES) and b.palo in (CORAZONES, DIAMANTES)) or \
+                    (a.palo in (PICAS, TREBOLES) and b.palo in (PICAS, TREBOLES)):
+                return False
+
+    return True
+
+
 # A partir de acá son funciones de bajo nivel de las rutinas de impresión...
 
 ANSI_ROJO = "\u001b[31;47m"
 ANSI_NEGRO = "\u001b[30;47m"
 ANSI_RESET = "\u001b[0m"
 
-def _c2s(valor, palo):
+# Representaciones ya calculadas de todos los códigos de carta, una tabla por
+# cada configuración (UNICODE_LINDO, COLOR, VALOR_10).
+_TABLAS_GLIFOS = {}
+
+def glifos():
+    """Devuelve una tupla con la representación de cada código de carta según
+    la configuración actual de UNICODE_LINDO, COLOR y VALOR_10. Los códigos de
+    cartas boca abajo se representan como el dorso."""
+    clave = (UNICODE_LINDO, COLOR, VALOR_10)
+    tabla = _TABLAS_GLIFOS.get(clave)
+    if tabla is None:
+        dorso = _armar_c2s(0, 0)
+        tabla = []
+        for c in range(CANTIDAD_CODIGOS):
+            valor, palo = c & BITS_VALOR, (c & BITS_PALO) >> 4
+            tabla.append(dorso if c & BOCA_ABAJO or valor > 13 else _armar_c2s(valor, palo))
+        tabla = _TABLAS_GLIFOS[clave] = tuple(tabla)
+    return tabla
+
+def _c2s(valor, palo=None):
+    if palo is None:
+        # Se recibió el código de la carta.
+        return glifos()[valor]
+    return glifos()[valor | palo << 4]
+
+def _armar_c2s(valor, palo):
     if COLOR:
         if palo in (CORAZONES, DIAMANTES):
             return _rojo(__c2s(valor, palo))
@@ -0,0 +1,118 @@
+from mesa import *
+
+
+class EstadoMesa:
+    """Posición inmutable de un solitario: las cartas de cada pila de la mesa
+    (en el orden de Mesa.pilas()) y los valores de los atributos ESTADO del
+    solitario. Cada pila es un bytes con los códigos de sus cartas de base a
+    tope, así que las cartas son valores y no objetos que puedan voltearse.
+
+    Los estados que se derivan uno de otro (ver Explorador.jugar) comparten
+    los bytes de las pilas que la jugada no tocó: un árbol de búsqueda sólo
+    guarda una tupla de referencias por nodo más las pilas que cambiaron.
+    Dos estados con las mismas cartas y valores son iguales y tienen el mismo
+    hash, sin importar cómo se llegó a ellos."""
+
+    __slots__ = ('pilas', 'valores', '_hash')
+
+    def __init__(self, pilas, valores=()):
+        """pilas: tupla de bytes, una por pila. valores: tupla con los valores
+        de los atributos ESTADO del solitario."""
+        self.pilas = tuple(pilas)
+        self.valores = tuple(valores)
+        self._hash = hash((self.pilas, self.valores))
+
+    def __eq__(self, otro):
+        return isinstance(otro, EstadoMesa) and self._hash == otro._hash and \
+            self.pilas == otro.pilas and self.valores == otro.valores
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return 'EstadoMesa({} pilas, {} cartas, {})'.format(
+            len(self.pilas), sum(len(pila) for pila in self.pilas), self.valores)
+
+
+def estado_de(mesa, solitario):
+    """Devuelve el EstadoMesa de la posición actual de mesa y solitario."""
+    return EstadoMesa([pila.vista() for pila in mesa.pilas()],
+                      [getattr(solitario, nombre) for nombre in getattr(solitario, 'ESTADO', ())])
+
+
+class Explorador:
+    """Aplica jugadas a EstadoMesa sin modificarlos. Usa una mesa y un
+    solitario ya armados como tablero de trabajo: para jugar desde un estado
+    se lo carga en ese tablero (reemplazando sólo las pilas distintas de las
+    de la posición cargada) y se juega con las reglas del propio solitario.
+
+    Las jugadas que mezclan cartas (como pedir el mazo en Reyerta cuando se
+    acabó) usan el generador del solitario de trabajo, así que su resultado
+    depende de lo explorado antes. Después de usar el explorador la mesa y el
+    solitario quedan en la última posición cargada, con el historial vacío."""
+
+    def __init__(self, mesa, solitario):
+        self.mesa = mesa
+        self.solitario = solitario
+        self._pilas = mesa.pilas()
+        self._nombres = getattr(solitario, 'ESTADO', ())
+        self._cargado = self._inicial = estado_de(mesa, solitario)
+
+    def inicial(self):
+        """Devuelve el estado de la posición en la que estaba el tablero de
+        trabajo al crear el explorador."""
+        return self._inicial
+
+    def cargar(self, estado):
+        """Pone el tablero de trabajo en la posición estado."""
+        if estado is self._cargado:
+            return
+        for pila, actual, nueva in zip(self._pilas, self._cargado.pilas, estado.pilas):
+            if actual is not nueva and actual != nueva:
+                pila.reemplazar(nueva)
+        if estado.valores != self._cargado.valores:
+            for nombre, valor in zip(self._nombres, estado.valores):
+                setattr(self.solitario, nombre, valor)
+            # La lista de movimientos del solitario sólo mira las versiones de
+            # las pilas, y hay jugadas cuya legalidad depende de ESTADO (como
+            # pedir el mazo en Reyerta): se la vuelve a armar.
+            if hasattr(self.solitario, '_movimientos'):
+                self.solitario._movimientos = None
+        # Las jugadas registradas son de otra rama de la búsqueda.
+        self.solitario.historial.limpiar()
+        self._cargado = estado
+
+    def jugar(self, estado, jugada):
+        """Devuelve el estado que resulta de efectuar jugada (como las de
+        Solitario.jugar) desde estado. Las pilas que la jugada no cambió son
+        las mismas de estado. Levanta SolitarioError si no puede jugarse."""
+        self.cargar(estado)
+        versiones = [pila.version for pila in self._pilas]
+        try:
+            self.solitario.jugar(jugada)
+        finally:
+            pilas = [anterior if pila.version == version else pila.vista()
+                     for pila, version, anterior in zip(self._pilas, versiones, estado.pilas)]
+            valores = [getattr(self.solitario, nombre) for nombre in self._nombres]
+            self._cargado = EstadoMesa(pilas, valores)
+        return self._cargado
+
+    def movimientos(self, estado):
+        """Devuelve la lista de jugadas legales desde estado."""
+        self.cargar(estado)
+        return self.solitario.movimientos()
+
+    def termino(self, estado):
+        """Indica si en estado el juego está terminado."""
+        self.cargar(estado)
+        return self.solitario.termino()
+
+    def progreso(self, estado):
+        """Devuelve el progreso (hecho, total) del solitario en estado."""
+        self.cargar(estado)
+        return self.solitario.progreso()
+
+    def hijos(self, estado):
+        """Devuelve la lista de pares (jugada, estado siguiente) de todas las
+        jugadas legales desde estado."""
+        return [(jugada, self.jugar(estado, jugada)) for jugada in list(self.movimientos(estado))]
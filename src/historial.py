@@ -0,0 +1,126 @@
+from mesa import *
+import collections
+
+MAX_DESHACER = 100
+
+
+class Historial:
+    """Registra los cambios que hace cada jugada sobre las pilas de la mesa de
+    un solitario para poder deshacerla y rehacerla. Deshacer o rehacer cuesta
+    tiempo proporcional a las cartas que tocó la jugada, así que también sirve
+    para explorar jugadas y volver atrás sin copiar la Mesa.
+
+    Cada jugada registrada es una tupla (estado_antes, estado_despues,
+    cambios) donde los estados son los valores de los atributos ESTADO del
+    solitario y cambios es la lista de cambios informados por las pilas (ver
+    PilaCartas), en el orden en que ocurrieron."""
+
+    def __init__(self, solitario, maximo=MAX_DESHACER):
+        """Crea un historial vacío para el solitario. Se recuerdan a lo sumo
+        las últimas maximo jugadas (None para no limitarlas)."""
+        self.solitario = solitario
+        self.hechas = collections.deque(maxlen=maximo)
+        self.deshechas = []
+        self._cambios = None
+
+    def registrar(self, *cambio):
+        """Lo llaman las pilas con cada cambio. Sólo se guardan los cambios
+        que ocurren durante efectuar()."""
+        if self._cambios is not None:
+            self._cambios.append(cambio)
+
+    def efectuar(self, accion):
+        """Efectúa accion (una tupla (función, argumentos...)) registrando los
+        cambios que haga. Si la acción es deshacer o rehacer no se registra."""
+        if getattr(accion[0], '__self__', None) is self:
+            accion[0](*accion[1:])
+            return
+        for pila in self.solitario.mesa.pilas():
+            pila.historial = self
+        antes = self._estado()
+        self._cambios = []
+        try:
+            accion[0](*accion[1:])
+        finally:
+            cambios, self._cambios = self._cambios, None
+            if cambios:
+                self.hechas.append((antes, self._estado(), cambios))
+                self.deshechas = []
+
+    def analizar(self, tipo):
+        """Devuelve el par (accion, error) para la jugada DESHACER o REHACER,
+        como el _analizar() de los solitarios."""
+        if tipo == DESHACER:
+            if not self.hechas:
+                return None, "No hay jugadas para deshacer."
+            return (self.deshacer,), None
+        if not self.deshechas:
+            return None, "No hay jugadas para rehacer."
+        return (self.rehacer,), None
+
+    def deshacer(self):
+        """Deshace la última jugada. Devuelve False si no había ninguna."""
+        if not self.hechas:
+            return False
+        jugada = self.hechas.pop()
+        antes, despues, cambios = jugada
+        for cambio in reversed(cambios):
+            _revertir(cambio)
+        self._restaurar(antes)
+        self.deshechas.append(jugada)
+        return True
+
+    def rehacer(self):
+        """Rehace la última jugada deshecha. Devuelve False si no había
+        ninguna."""
+        if not self.deshechas:
+            return False
+        jugada = self.deshechas.pop()
+        antes, despues, cambios = jugada
+        for cambio in cambios:
+            _aplicar(cambio)
+        self._restaurar(despues)
+        self.hechas.append(jugada)
+        return True
+
+    def limpiar(self):
+        """Olvida todas las jugadas registradas."""
+        self.hechas.clear()
+        self.deshechas = []
+
+    def _estado(self):
+        return tuple(getattr(self.solitario, nombre) for nombre in getattr(self.solitario, 'ESTADO', ()))
+
+    def _restaurar(self, estado):
+        for nombre, valor in zip(getattr(self.solitario, 'ESTADO', ()), estado):
+            setattr(self.solitario, nombre, valor)
+
+
+def _aplicar(cambio):
+    """Vuelve a efectuar un cambio registrado, sin chequeos."""
+    tipo, pila = cambio[:2]
+    if tipo == APILADA:
+        pila.apilar(cambio[2], forzar=True)
+    elif tipo == DESAPILADA:
+        pila._quitar_tope()
+    elif tipo == VOLTEADA:
+        pila.voltear_tope()
+    elif tipo == RECIBIDAS:
+        pila._recibir(cambio[2], cambio[3])
+    elif tipo == REEMPLAZADA:
+        pila.reemplazar(cambio[3])
+
+
+def _revertir(cambio):
+    """Deshace un cambio registrado, sin chequeos."""
+    tipo, pila = cambio[:2]
+    if tipo == APILADA:
+        pila._quitar_tope()
+    elif tipo == DESAPILADA:
+        pila.apilar(cambio[2], forzar=True)
+    elif tipo == VOLTEADA:
+        pila.voltear_tope()
+    elif tipo == RECIBIDAS:
+        cambio[2]._recibir(pila, cambio[3])
+    elif tipo == REEMPLAZADA:
+        pila.reemplazar(cambio[2])
@@ -0,0 +1,266 @@
+from mesa import *
+import contextlib, heapq, io, mmap, os, random, struct, sys, time
+
+# Índice en disco de los repartos numerados (ver repartos.Azar) de cada
+# solitario: si se pudo ganar, en cuántas jugadas, cuántos nodos costó
+# encontrarlo y su dificultad. Se arma una vez con este módulo y main lo
+# abre con mmap para elegir un reparto ganable sin buscar nada al empezar.
+#
+# Formato (enteros little endian):
+#   MAGIA_INDICE y cantidad de juegos (H).
+#   Por cada juego: nombre (16 bytes, utf-8 completado con ceros), primer
+#   reparto (I), cantidad de repartos (I), posición de sus registros (I),
+#   posición de su tabla de ganables (I) y por cada una de DIFICULTADES el
+#   comienzo (en la tabla) y la cantidad de sus repartos (I, I).
+#   Registros: uno por reparto, en orden: resultado (B), dificultad (B),
+#   jugadas de la solución (H) y nodos expandidos (I).
+#   Tablas de ganables: los números de los repartos ganables (I), agrupados
+#   por dificultad.
+MAGIA_INDICE = b'SIX\x01'
+ARCHIVO_INDICE = 'repartos.idx'
+
+DIFICULTADES = ('fácil', 'media', 'difícil')
+SIN_DIFICULTAD = 0xFF
+
+NO_GANABLE = 0
+GANABLE = 1
+SIN_RESOLVER = 2
+
+MAX_NODOS = 20000
+TAMANIO_BLOQUE = 16
+
+_CABECERA = struct.Struct('<4sH')
+_JUEGO = struct.Struct('<16sIIII' + 'II' * len(DIFICULTADES))
+_REGISTRO = struct.Struct('<BBHI')
+_NUMERO = struct.Struct('<I')
+
+
+class IndiceRepartos:
+    """Índice de repartos abierto con mmap: las consultas leen sólo los bytes
+    que necesitan, sin cargar el archivo."""
+
+    def __init__(self, archivo=ARCHIVO_INDICE):
+        """Abre el índice. Levanta IOError si no puede leerse y ValueError si
+        no es un índice."""
+        with open(archivo, 'rb') as f:
+            self._datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magia, cantidad = _CABECERA.unpack_from(self._datos, 0)
+            if magia != MAGIA_INDICE:
+                raise ValueError("No es un índice de repartos")
+            self._juegos = {}
+            for i in range(cantidad):
+                campos = _JUEGO.unpack_from(self._datos, _CABECERA.size + i * _JUEGO.size)
+                nombre = campos[0].rstrip(b'\0').decode('utf-8')
+                self._juegos[nombre] = campos[1:]
+        except (struct.error, UnicodeDecodeError):
+            self._datos.close()
+            raise ValueError("Índice de repartos dañado")
+        except ValueError:
+            self._datos.close()
+            raise
+
+    def cerrar(self):
+        self._datos.close()
+
+    def juegos(self):
+        """Devuelve los nombres de los juegos indexados."""
+        return list(self._juegos)
+
+    def cantidades(self, juego):
+        """Devuelve la cantidad de repartos ganables de cada dificultad del
+        juego (ceros si no está indexado)."""
+        if juego not in self._juegos:
+            return [0] * len(DIFICULTADES)
+        return list(self._juegos[juego][5::2])
+
+    def registro(self, juego, numero):
+        """Devuelve (resultado, dificultad, jugadas, nodos) del reparto numero
+        del juego, o None si no está en el índice."""
+        if juego not in self._juegos:
+            return None
+        primero, cantidad, registros = self._juegos[juego][:3]
+        if not primero <= numero < primero + cantidad:
+            return None
+        return _REGISTRO.unpack_from(self._datos, registros + (numero - primero) * _REGISTRO.size)
+
+    def al_azar(self, juego, dificultad, azar=random):
+        """Devuelve el número de un reparto ganable del juego con la dificultad
+        (índice en DIFICULTADES) elegido con azar, o None si no hay ninguno."""
+        if juego not in self._juegos:
+            return None
+        campos = self._juegos[juego]
+        comienzo, cantidad = campos[4 + 2 * dificultad], campos[5 + 2 * dificultad]
+        if not cantidad:
+            return None
+        posicion = campos[3] + (comienzo + azar.randrange(cantidad)) * _NUMERO.size
+        return _NUMERO.unpack_from(self._datos, posicion)[0]
+
+
+def abrir_indice(archivo=ARCHIVO_INDICE):
+    """Devuelve el IndiceRepartos de archivo, o None si no existe o no es un
+    índice válido."""
+    try:
+        return IndiceRepartos(archivo)
+    except (IOError, ValueError):
+        return None
+
+
+def resolver(mesa, solitario, max_nodos=MAX_NODOS):
+    """Busca cómo ganar desde la posición de mesa y solitario con una
+    búsqueda best-first sobre EstadoMesa (ver estado.Explorador), priorizando
+    el progreso del solitario. El generador del solitario tiene que ser un
+    repartos.Azar, como el de los repartos numerados de main.armar_juego.
+    Devuelve (resultado, solución, nodos), con la solución como lista de
+    jugadas (o None si no se ganó).
+
+    Las jugadas que mezclan cartas (pedir el mazo acabado en Reyerta) usan el
+    generador, y su mezcla depende sólo de cuántos valores se sacaron antes.
+    Por eso cada nodo guarda el contador del generador junto con el estado y
+    se lo restituye antes de cada jugada: las mezclas de la búsqueda son las
+    mismas que salen al jugar la solución sobre el reparto recién armado."""
+    from estado import Explorador
+    azar = solitario.azar
+    if not hasattr(azar, 'contador'):
+        raise ValueError("resolver necesita un reparto numerado (repartos.Azar)")
+    explorador = Explorador(mesa, solitario)
+    # Cada nodo es (estado, contador del generador).
+    inicial = (explorador.inicial(), azar.contador)
+    # Por cada nodo alcanzado: (nodo anterior, jugada).
+    padres = {inicial: None}
+    frontera = [(-explorador.progreso(inicial[0])[0], 0, 0, inicial)]
+    contador = 1
+    nodos = 0
+    while frontera:
+        if nodos >= max_nodos:
+            return SIN_RESOLVER, None, nodos
+        prioridad, jugadas, orden, nodo = heapq.heappop(frontera)
+        estado, usados = nodo
+        nodos += 1
+        if explorador.termino(estado):
+            return GANABLE, _camino(padres, nodo), nodos
+        for jugada in list(explorador.movimientos(estado)):
+            azar.contador = usados
+            hijo = (explorador.jugar(estado, jugada), azar.contador)
+            if hijo in padres:
+                continue
+            padres[hijo] = (nodo, jugada)
+            heapq.heappush(frontera, (-explorador.progreso(hijo[0])[0], jugadas + 1, contador, hijo))
+            contador += 1
+    return NO_GANABLE, None, nodos
+
+
+def _camino(padres, nodo):
+    """Devuelve la lista de jugadas desde el nodo inicial hasta nodo."""
+    jugadas = []
+    while padres[nodo] is not None:
+        nodo, jugada = padres[nodo]
+        jugadas.append(jugada)
+    jugadas.reverse()
+    return jugadas
+
+
+def indexar_reparto(juego, numero, max_nodos=MAX_NODOS):
+    """Arma el reparto numerado del juego (como main -reparto) y lo resuelve.
+    Spider usa su solver propio (ver solver_spider). Devuelve (resultado,
+    jugadas, nodos)."""
+    from main import armar_juego
+    with contextlib.redirect_stdout(io.StringIO()):
+        mesa, solitario = armar_juego(juego, '#{}'.format(numero))
+        if juego == 'Spider':
+            from solver_spider import resolver as resolver_spider
+            resultado = resolver_spider(mesa, max_nodos)
+            ganable = {True: GANABLE, False: NO_GANABLE, None: SIN_RESOLVER}[resultado.ganable]
+            return ganable, len(resultado.solucion or ()), resultado.nodos
+        resultado, solucion, nodos = resolver(mesa, solitario, max_nodos)
+        return resultado, len(solucion or ()), nodos
+
+
+def _indexar_bloque(argumentos):
+    """Unidad de trabajo de cada proceso: indexa un bloque de repartos."""
+    juego, numeros, max_nodos = argumentos
+    return [indexar_reparto(juego, numero, max_nodos) for numero in numeros]
+
+
+def indexar(juego, desde, hasta, max_nodos=MAX_NODOS, procesos=None, bloque=TAMANIO_BLOQUE):
+    """Devuelve la lista de (resultado, jugadas, nodos) de los repartos de
+    desde a hasta (inclusive) del juego, resueltos en bloques entre
+    procesos."""
+    numeros = list(range(desde, hasta + 1))
+    bloques = [(juego, numeros[i:i + bloque], max_nodos) for i in range(0, len(numeros), bloque)]
+    if procesos == 1:
+        return [r for b in bloques for r in _indexar_bloque(b)]
+    # Se importa acá: main abre el índice al empezar y no necesita procesos.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        return [r for resultados in ejecutor.map(_indexar_bloque, bloques) for r in resultados]
+
+
+def _dificultades(resultados):
+    """Devuelve la dificultad de cada resultado: los ganables se reparten en
+    partes iguales entre DIFICULTADES según los nodos que costó resolverlos
+    (a igual costo, según el largo de la solución)."""
+    ganables = sorted((nodos, jugadas, i) for i, (resultado, jugadas, nodos) in enumerate(resultados) if resultado == GANABLE)
+    dificultades = [SIN_DIFICULTAD] * len(resultados)
+    for posicion, (nodos, jugadas, i) in enumerate(ganables):
+        dificultades[i] = posicion * len(DIFICULTADES) // len(ganables)
+    return dificultades
+
+
+def guardar_indice(indexados, archivo=ARCHIVO_INDICE):
+    """Escribe el índice de indexados, un dict de nombre de juego a (primer
+    reparto, lista de (resultado, jugadas, nodos)). Se escribe en un archivo
+    aparte y se renombra, para que un índice abierto nunca quede a medias."""
+    juegos = sorted(indexados)
+    posicion = _CABECERA.size + len(juegos) * _JUEGO.size
+    cabeceras, cuerpo = [], []
+    for juego in juegos:
+        primero, resultados = indexados[juego]
+        dificultades = _dificultades(resultados)
+        registros = posicion
+        for (resultado, jugadas, nodos), dificultad in zip(resultados, dificultades):
+            cuerpo.append(_REGISTRO.pack(resultado, dificultad, min(jugadas, 0xFFFF), min(nodos, 0xFFFFFFFF)))
+        posicion += len(resultados) * _REGISTRO.size
+
+        tabla, rangos = posicion, []
+        for d in range(len(DIFICULTADES)):
+            numeros = [primero + i for i, dificultad in enumerate(dificultades) if dificultad == d]
+            rangos += [(posicion - tabla) // _NUMERO.size, len(numeros)]
+            cuerpo.append(struct.pack('<{}I'.format(len(numeros)), *numeros))
+            posicion += len(numeros) * _NUMERO.size
+        cabeceras.append(_JUEGO.pack(juego.encode('utf-8')[:16], primero, len(resultados), registros, tabla, *rangos))
+
+    temporal = archivo + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(_CABECERA.pack(MAGIA_INDICE, len(juegos)))
+        f.writelines(cabeceras)
+        f.writelines(cuerpo)
+    os.replace(temporal, archivo)
+
+
+def main():
+    import argparse
+    from main import SOLITARIOS
+    parser = argparse.ArgumentParser(description="Arma el índice de dificultad de los repartos numerados de cada solitario.")
+    parser.add_argument('desde', type=int)
+    parser.add_argument('hasta', type=int)
+    parser.add_argument('--juegos', nargs='+', choices=sorted(SOLITARIOS.keys()), default=sorted(SOLITARIOS.keys()))
+    parser.add_argument('--max-nodos', type=int, default=MAX_NODOS)
+    parser.add_argument('--procesos', type=int, default=os.cpu_count())
+    parser.add_argument('--bloque', type=int, default=TAMANIO_BLOQUE)
+    parser.add_argument('--archivo', default=ARCHIVO_INDICE)
+    args = parser.parse_args()
+
+    indexados = {}
+    for juego in args.juegos:
+        inicio = time.perf_counter()
+        resultados = indexar(juego, args.desde, args.hasta, args.max_nodos, args.procesos, args.bloque)
+        indexados[juego] = (args.desde, resultados)
+        ganables = sum(resultado == GANABLE for resultado, jugadas, nodos in resultados)
+        sin_resolver = sum(resultado == SIN_RESOLVER for resultado, jugadas, nodos in resultados)
+        print("{}: {} repartos, {} ganables, {} sin resolver ({:.1f} s)".format(
+            juego, len(resultados), ganables, sin_resolver, time.perf_counter() - inicio), file=sys.stderr)
+    guardar_indice(indexados, args.archivo)
+
+if __name__ == "__main__":
+    main()
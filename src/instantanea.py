@@ -0,0 +1,217 @@
+from mesa import *
+from repartos import Azar
+import hashlib, os, random, struct
+
+# Formato de una instantánea (enteros little endian):
+#   MAGIA, cantidad de fundaciones (B), cantidad de pilas del tablero (B),
+#   presencia de mazo y descarte (B, bits 0 y 1).
+#   Por cada pila (fundaciones, tablero, mazo, descarte): largo (H) y los
+#   códigos de sus cartas de base a tope (un byte por carta, incluye el bit
+#   de boca abajo).
+#   Cantidad de atributos de solitario.ESTADO (B) y sus valores (i).
+#   Estado de random: versión (B), 625 enteros (I) y gauss_next (B + d).
+#   Generador del solitario (su atributo azar): si es un repartos.Azar (B),
+#   su número y su contador (Q, Q).
+#   Historial de deshacer: cantidad de jugadas hechas y deshechas (H, H) y
+#   cada jugada: estado antes y después (i por atributo de ESTADO), cantidad
+#   de cambios (H) y cada cambio: tipo (B), pila (B, índice en mesa.pilas())
+#   y sus datos (ver _guardar_cambio).
+MAGIA = b'SOL\x03'
+MAGIA_CHECKPOINT = b'SCK\x02'
+
+ARCHIVO_CHECKPOINT = 'solitario.chk'
+CADA_CHECKPOINT = 50
+
+_ESTADO_RANDOM = struct.Struct('<B625IBd')
+_ESTADO_AZAR = struct.Struct('<BQQ')
+_CABECERA_CHECKPOINT = struct.Struct('<4sIHH')
+
+
+def guardar(mesa, solitario):
+    """Devuelve una instantánea binaria (bytes) del estado completo del juego:
+    las pilas de la mesa, el estado propio del solitario y el de random."""
+    pilas = mesa.pilas()
+    presentes = (mesa.mazo is not None) | (mesa.descarte is not None) << 1
+    partes = [MAGIA, struct.pack('<BBB', len(mesa.fundaciones), len(mesa.pilas_tablero), presentes)]
+    for pila in pilas:
+        codigos = pila.codigos()
+        partes.append(struct.pack('<H', len(codigos)))
+        partes.append(bytes(codigos))
+
+    estado = getattr(solitario, 'ESTADO', ())
+    partes.append(struct.pack('<B', len(estado)))
+    partes.append(struct.pack('<{}i'.format(len(estado)), *[getattr(solitario, nombre) for nombre in estado]))
+
+    version, interno, gauss = random.getstate()
+    partes.append(_ESTADO_RANDOM.pack(version, *interno, gauss is not None, gauss or 0.0))
+    azar = getattr(solitario, 'azar', None)
+    if isinstance(azar, Azar):
+        partes.append(_ESTADO_AZAR.pack(1, azar.numero, azar.contador))
+    else:
+        partes.append(_ESTADO_AZAR.pack(0, 0, 0))
+
+    historial = getattr(solitario, 'historial', None)
+    jugadas = [historial.hechas, historial.deshechas] if historial else [(), ()]
+    partes.append(struct.pack('<HH', *[len(lista) for lista in jugadas]))
+    indices = {id(pila): i for i, pila in enumerate(pilas)}
+    formato_estado = '<{}i'.format(len(estado))
+    for lista in jugadas:
+        for antes, despues, cambios in lista:
+            partes.append(struct.pack(formato_estado, *antes))
+            partes.append(struct.pack(formato_estado, *despues))
+            partes.append(struct.pack('<H', len(cambios)))
+            for cambio in cambios:
+                _guardar_cambio(partes, cambio, indices)
+    return b''.join(partes)
+
+
+def _guardar_cambio(partes, cambio, indices):
+    """Agrega a partes la codificación de un cambio del historial."""
+    tipo, pila = cambio[:2]
+    partes.append(struct.pack('<BB', tipo, indices[id(pila)]))
+    if tipo in (APILADA, DESAPILADA):
+        partes.append(struct.pack('<B', cambio[2]))
+    elif tipo == RECIBIDAS:
+        partes.append(struct.pack('<BB', indices[id(cambio[2])], cambio[3]))
+    elif tipo == REEMPLAZADA:
+        for codigos in cambio[2:]:
+            partes.append(struct.pack('<H', len(codigos)))
+            partes.append(bytes(codigos))
+
+
+def _cargar_cambio(datos, posicion, pilas):
+    """Decodifica el cambio del historial que empieza en posicion. Devuelve
+    el cambio y la posición siguiente."""
+    tipo = datos[posicion]
+    pila = pilas[datos[posicion + 1]]
+    posicion += 2
+    if tipo == APILADA or tipo == DESAPILADA:
+        return (tipo, pila, datos[posicion]), posicion + 1
+    if tipo == RECIBIDAS:
+        return (tipo, pila, pilas[datos[posicion]], datos[posicion + 1]), posicion + 2
+    if tipo == REEMPLAZADA:
+        cambio = [tipo, pila]
+        for i in range(2):
+            largo, = struct.unpack_from('<H', datos, posicion)
+            cambio.append(datos[posicion + 2:posicion + 2 + largo].tolist())
+            posicion += 2 + largo
+        return tuple(cambio), posicion
+    return (tipo, pila), posicion
+
+
+def cargar(datos, mesa, solitario):
+    """Restaura sobre la mesa y el solitario (ya armados, así las pilas tienen
+    sus criterios) el estado de la instantánea datos.
+    Levanta ValueError si la instantánea no corresponde a la mesa."""
+    datos = memoryview(datos)
+    if bytes(datos[:4]) != MAGIA:
+        raise ValueError("La instantánea no es válida.")
+    fundaciones, tablero, presentes = struct.unpack_from('<BBB', datos, 4)
+    pilas = mesa.pilas()
+    presentes_mesa = (mesa.mazo is not None) | (mesa.descarte is not None) << 1
+    if (fundaciones, tablero, presentes) != (len(mesa.fundaciones), len(mesa.pilas_tablero), presentes_mesa):
+        raise ValueError("La instantánea no corresponde a la mesa.")
+
+    # Se decodifica todo antes de tocar la mesa, para no dejarla a medias.
+    posicion = 7
+    contenidos = []
+    for pila in pilas:
+        largo, = struct.unpack_from('<H', datos, posicion)
+        posicion += 2
+        contenidos.append(datos[posicion:posicion + largo].tolist())
+        posicion += largo
+
+    cantidad, = struct.unpack_from('<B', datos, posicion)
+    posicion += 1
+    estado = getattr(solitario, 'ESTADO', ())
+    if cantidad != len(estado):
+        raise ValueError("La instantánea no corresponde al solitario.")
+    valores = struct.unpack_from('<{}i'.format(cantidad), datos, posicion)
+    posicion += 4 * cantidad
+
+    aleatorio = _ESTADO_RANDOM.unpack_from(datos, posicion)
+    posicion += _ESTADO_RANDOM.size
+    es_azar, numero, contador = _ESTADO_AZAR.unpack_from(datos, posicion)
+    posicion += _ESTADO_AZAR.size
+
+    cantidades = struct.unpack_from('<HH', datos, posicion)
+    posicion += 4
+    formato_estado = struct.Struct('<{}i'.format(cantidad))
+    jugadas = ([], [])
+    for lista, cantidad_jugadas in zip(jugadas, cantidades):
+        for j in range(cantidad_jugadas):
+            antes = formato_estado.unpack_from(datos, posicion)
+            despues = formato_estado.unpack_from(datos, posicion + formato_estado.size)
+            posicion += 2 * formato_estado.size
+            cantidad_cambios, = struct.unpack_from('<H', datos, posicion)
+            posicion += 2
+            cambios = []
+            for k in range(cantidad_cambios):
+                cambio, posicion = _cargar_cambio(datos, posicion, pilas)
+                cambios.append(cambio)
+            lista.append((antes, despues, cambios))
+    if posicion != len(datos):
+        raise ValueError("La instantánea no es válida.")
+
+    for pila, codigos in zip(pilas, contenidos):
+        pila.reemplazar(codigos)
+    for nombre, valor in zip(estado, valores):
+        setattr(solitario, nombre, valor)
+    random.setstate((aleatorio[0], aleatorio[1:626], aleatorio[627] if aleatorio[626] else None))
+    if hasattr(solitario, 'azar'):
+        solitario.azar = Azar(numero, contador) if es_azar else random
+    historial = getattr(solitario, 'historial', None)
+    if historial:
+        historial.limpiar()
+        historial.hechas.extend(jugadas[0])
+        historial.deshechas.extend(jugadas[1])
+
+
+def huella(mesa, solitario):
+    """Devuelve un resumen (16 dígitos hexadecimales) de la posición del
+    juego: las cartas de cada pila y el estado propio del solitario. No
+    incluye random ni el historial, así que dos posiciones iguales tienen la
+    misma huella aunque se haya llegado a ellas por caminos distintos."""
+    resumen = hashlib.blake2b(digest_size=8)
+    for pila in mesa.pilas():
+        resumen.update(struct.pack('<H', len(pila)))
+        resumen.update(pila.vista())
+    estado = getattr(solitario, 'ESTADO', ())
+    resumen.update(struct.pack('<{}i'.format(len(estado)), *[getattr(solitario, nombre) for nombre in estado]))
+    return resumen.hexdigest()
+
+
+def guardar_checkpoint(mesa, solitario, seed, juego, cantidad, archivo=ARCHIVO_CHECKPOINT):
+    """Guarda en archivo la instantánea del juego después de los primeros
+    cantidad comandos del log. seed es la semilla o el reparto del log (ver
+    main.recuperar). La escritura es atómica: si se interrumpe queda el
+    checkpoint anterior."""
+    semilla, nombre = str(seed).encode('utf-8'), juego.encode('utf-8')
+    datos = _CABECERA_CHECKPOINT.pack(MAGIA_CHECKPOINT, cantidad, len(semilla), len(nombre)) + semilla + nombre + guardar(mesa, solitario)
+    temporal = archivo + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, archivo)
+
+
+def cargar_checkpoint(mesa, solitario, seed, juego, maximo, archivo=ARCHIVO_CHECKPOINT):
+    """Si archivo tiene un checkpoint del juego y la semilla indicados, que no
+    incluya más de maximo comandos, lo restaura sobre la mesa y el solitario
+    armados y devuelve la cantidad de comandos del log que ya incluye. Si no,
+    devuelve 0 sin tocar nada."""
+    try:
+        with open(archivo, 'rb') as f:
+            datos = f.read()
+        magia, cantidad, largo_semilla, largo = _CABECERA_CHECKPOINT.unpack_from(datos)
+        inicio = _CABECERA_CHECKPOINT.size + largo_semilla
+        if magia != MAGIA_CHECKPOINT or datos[_CABECERA_CHECKPOINT.size:inicio] != str(seed).encode('utf-8'):
+            return 0
+        if datos[inicio:inicio + largo] != juego.encode('utf-8'):
+            return 0
+        if cantidad > maximo:
+            # El log quedó más corto que el checkpoint, no se puede usar.
+            return 0
+        cargar(datos[inicio + largo:], mesa, solitario)
+    except (IOError, ValueError, struct.error):
+        return 0
+    return cantidad
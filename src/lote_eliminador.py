@@ -0,0 +1,179 @@
+from solitario_eliminador import FUNDACIONES, PILAS
+from repartos import barajar_lote
+import argparse, random, time
+
+try:
+    import numpy as np
+except ImportError:
+    # El motor en lote es opcional, el resto del juego no necesita NumPy.
+    np = None
+
+CARTAS = 52
+ALTURA = CARTAS // PILAS
+POLITICAS = ('aleatoria', 'codiciosa')
+TAMANIO_BLOQUE = 100000
+
+# Valores del mazo de crear_mazo() antes de mezclar. En el Eliminador sólo
+# importan los valores: el criterio CONSECUTIVA no mira los palos.
+_VALORES_MAZO = [v % 13 + 1 for v in range(CARTAS)]
+
+# _ACEPTA[f]: máscara de bits de los valores que pueden apilarse sobre una
+# fundación de tope f (0 si está vacía): cualquiera o los consecutivos, con
+# vuelta de K a A. El bit 0 (una pila vacía) nunca está.
+_ACEPTA = [sum(1 << c for c in range(1, 14) if f == 0 or c == f % 13 + 1 or f == c % 13 + 1) for f in range(14)]
+
+
+def _necesita_numpy():
+    if np is None:
+        raise ImportError("lote_eliminador necesita NumPy (pip install numpy)")
+
+
+def valores_semilla(semilla):
+    """Devuelve los valores de las cartas del reparto de la semilla, tal como
+    lo arma SolitarioEliminador después de random.seed(semilla): la carta i
+    va a la pila i % PILAS, de base a tope."""
+    azar = random.Random(semilla)
+    # crear_mazo() sortea el color y el palo antes de mezclar, aunque con 4
+    # palos no los use; mezclar() baraja la lista desde el tope.
+    azar.randint(0, 1)
+    azar.randint(0, 3)
+    valores = _VALORES_MAZO[::-1]
+    azar.shuffle(valores)
+    return valores
+
+
+def repartos_semillas(semillas):
+    """Devuelve un array (cantidad, PILAS, ALTURA) con las pilas de los
+    repartos de las semillas (los mismos que en main y simulacion)."""
+    _necesita_numpy()
+    valores = np.array([valores_semilla(s) for s in semillas], dtype=np.int8)
+    return _a_pilas(valores)
+
+
+def repartos_numerados(numeros):
+    """Devuelve un array (cantidad, PILAS, ALTURA) con las pilas de los
+    repartos numerados (los de main -reparto), mezclados todos a la vez."""
+    _necesita_numpy()
+    # Como en valores_semilla(): dos valores para el color y el palo y
+    # después la mezcla desde el tope.
+    valores = barajar_lote(numeros, np.array(_VALORES_MAZO[::-1], dtype=np.int8), desde=2)
+    return _a_pilas(valores)
+
+
+def repartos_aleatorios(cantidad, rng):
+    """Devuelve un array (cantidad, PILAS, ALTURA) con repartos mezclados con
+    el numpy.random.Generator rng. Mucho más rápido que repartos_semillas()
+    pero los repartos no corresponden a semillas de main."""
+    _necesita_numpy()
+    valores = rng.permuted(np.tile(np.array(_VALORES_MAZO, dtype=np.int8), (cantidad, 1)), axis=1)
+    return _a_pilas(valores)
+
+
+def _a_pilas(valores):
+    """Reparte en ronda los valores (cantidad, CARTAS) sobre las pilas."""
+    return np.ascontiguousarray(valores.reshape(len(valores), ALTURA, PILAS).transpose(0, 2, 1))
+
+
+def jugar_lote(pilas, politica='aleatoria', rng=None):
+    """Juega a la vez todas las partidas de pilas (ver repartos_semillas) con
+    la política indicada:
+        aleatoria: una jugada legal cualquiera.
+        codiciosa: prefiere apilar sobre fundaciones no vacías (guardando las
+            vacías) y sacar de las pilas más altas.
+    Devuelve un par de arrays (gano, jugadas) con un elemento por partida."""
+    _necesita_numpy()
+    if rng is None:
+        rng = np.random.default_rng()
+    acepta = np.array(_ACEPTA, dtype=np.int16)
+    cantidad = len(pilas)
+    gano = np.zeros(cantidad, dtype=bool)
+    jugadas = np.zeros(cantidad, dtype=np.int16)
+
+    # Sólo se trabaja sobre las partidas que siguen en juego: activas tiene
+    # sus números y el resto de los arrays sólo sus filas.
+    activas = np.arange(cantidad)
+    pilas = np.asarray(pilas, dtype=np.int8)
+    alturas = np.full((cantidad, PILAS), ALTURA, dtype=np.int8)
+    topes = np.zeros((cantidad, FUNDACIONES), dtype=np.int8)
+    # Valor del tope de cada pila, 0 si está vacía.
+    cartas = pilas[:, :, ALTURA - 1].astype(np.int16)
+
+    # Cada jugada saca una carta, así que alcanzan CARTAS pasos.
+    for paso in range(CARTAS + 1):
+        if not len(activas):
+            break
+        filas = np.arange(len(activas))
+
+        # legales[i, p, f]: en la partida i puede moverse el tope de la pila
+        # p a la fundación f.
+        legales = (acepta[topes][:, None, :] >> cartas[:, :, None]) & 1
+
+        # Se elige la jugada legal de mayor puntaje; las ilegales quedan en 0.
+        puntaje = rng.random(legales.shape, dtype=np.float32)
+        puntaje += 1
+        if politica == 'codiciosa':
+            puntaje += 2 * (topes[:, None, :] > 0) + alturas[:, :, None] / np.float32(ALTURA + 1)
+        puntaje *= legales
+        puntaje = puntaje.reshape(len(activas), PILAS * FUNDACIONES)
+        eleccion = puntaje.argmax(axis=1)
+        mueve = puntaje[filas, eleccion] > 0
+
+        if not mueve.all():
+            # Las partidas sin jugadas terminan: ganadas si vaciaron las pilas.
+            gano[activas[~mueve]] = alturas[~mueve].sum(axis=1) == 0
+            activas, pilas, alturas, topes = activas[mueve], pilas[mueve], alturas[mueve], topes[mueve]
+            cartas, eleccion, filas = cartas[mueve], eleccion[mueve], filas[:len(activas)]
+
+        p = eleccion // FUNDACIONES
+        topes[filas, eleccion % FUNDACIONES] = cartas[filas, p]
+        alturas[filas, p] -= 1
+        altura = alturas[filas, p]
+        cartas[filas, p] = np.where(altura > 0, pilas[filas, p, np.maximum(altura - 1, 0)], 0)
+        jugadas[activas] += 1
+
+    return gano, jugadas
+
+
+def estimar(cantidad, politica='aleatoria', semilla=None, bloque=TAMANIO_BLOQUE):
+    """Juega cantidad repartos aleatorios en bloques de a lo sumo bloque
+    partidas. Devuelve la cantidad de partidas ganadas."""
+    _necesita_numpy()
+    rng = np.random.default_rng(semilla)
+    ganadas = 0
+    for desde in range(0, cantidad, bloque):
+        pilas = repartos_aleatorios(min(bloque, cantidad - desde), rng)
+        gano, jugadas = jugar_lote(pilas, politica, rng)
+        ganadas += int(gano.sum())
+    return ganadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estima en lote la proporción de partidas ganadas del Eliminador.")
+    parser.add_argument('cantidad', type=int, help="cantidad de repartos, o la última semilla o reparto con --semillas o --repartos")
+    parser.add_argument('--politica', choices=POLITICAS, default='aleatoria')
+    parser.add_argument('--semilla', type=int, default=None, help="semilla de los repartos aleatorios")
+    parser.add_argument('--semillas', type=int, metavar='DESDE', default=None,
+                        help="jugar los repartos de main de las semillas DESDE a cantidad (inclusive)")
+    parser.add_argument('--repartos', type=int, metavar='DESDE', default=None,
+                        help="jugar los repartos numerados DESDE a cantidad (inclusive)")
+    parser.add_argument('--bloque', type=int, default=TAMANIO_BLOQUE)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.semillas is not None or args.repartos is not None:
+        if args.semillas is not None:
+            pilas = repartos_semillas(range(args.semillas, args.cantidad + 1))
+        else:
+            pilas = repartos_numerados(np.arange(args.repartos, args.cantidad + 1))
+        partidas = len(pilas)
+        gano, jugadas = jugar_lote(pilas, args.politica, np.random.default_rng(args.semilla))
+        ganadas = int(gano.sum())
+    else:
+        partidas = args.cantidad
+        ganadas = estimar(partidas, args.politica, args.semilla, args.bloque)
+    segundos = time.perf_counter() - inicio
+    print("{} partidas, {} ganadas ({:.2%}), {:.0f} partidas/s".format(
+        partidas, ganadas, ganadas / partidas if partidas else 0, partidas / segundos if segundos else 0))
+
+if __name__ == "__main__":
+    main()
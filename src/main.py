@@ -1,29 +1,36 @@
-from solitario_ejemplo import *
-from solitario_reyerta import *
-from solitario_eliminador import *
-from solitario_spider import *
-
-SOLITARIOS = {
-	# "Nombre": (Clase, parámetros constructor),
-        "Eliminador": (SolitarioEliminador, None),
-        "Reyerta": (SolitarioReyerta, None),
-        "Spider": (SolitarioSpider, None),
-    }
+from registro import *
+
+# Los módulos de los solitarios se importan recién cuando se elige uno (ver
+# registro.Registro).
+SOLITARIOS = Registro({
+	# "Nombre": (módulo, clase, parámetros constructor),
+        "Eliminador": ("solitario_eliminador", "SolitarioEliminador", None),
+        "Reyerta": ("solitario_reyerta", "SolitarioReyerta", None),
+        "Spider": ("solitario_spider", "SolitarioSpider", None),
+    })
 
 LOGFILE = 'solitario.log'
 
+# Modo en lote (--batch): separador de varios comandos en una línea y comando
+# que pide la mesa dibujada.
+SEPARADOR_COMANDOS = ';'
+COMANDO_MESA = '?'
+
 from mesa import *
+from instantanea import *
+from repartos import Azar
+import perfil
 
-import sys, random, datetime
+import sys, os, random, contextlib, io, json, time
 
 def loguear(logfile, valor):
     if logfile:
         logfile.write('{}\n'.format(valor))
 
-def recuperar():
+def recuperar(archivo=LOGFILE):
     try:
-        with open(LOGFILE) as f:
-            seed = int(f.readline().rstrip('\n'))
+        with open(archivo) as f:
+            seed = leer_semilla(f.readline().rstrip('\n'))
             juego = f.readline().rstrip('\n')
             comandos = [l.rstrip('\n') for l in f]
     except (IOError, ValueError):
@@ -31,6 +38,14 @@ def recuperar():
         return None
     return (seed, juego, comandos)
 
+def leer_semilla(texto):
+    """Convierte la semilla de un log o de la línea de comandos: los repartos
+    numerados se escriben "#N" (y quedan como string), las semillas como N.
+    Levanta ValueError si no es ninguna de las dos."""
+    if texto.startswith('#'):
+        return '#{}'.format(int(texto[1:]))
+    return int(texto)
+
 def pedir_juego(juegos):
     print("SOLITARIOS:")
     juegos = sorted(juegos)
@@ -47,20 +62,207 @@ def pedir_juego(juegos):
 
     return juegos[n - 1]
 
+def pedir_reparto(juego, archivo=None):
+    """Si el índice de repartos (ver indice_repartos) tiene repartos
+    ganables del juego, ofrece uno al azar de la dificultad que se elija.
+    Devuelve el número del reparto, o None para jugar uno cualquiera."""
+    # Como los solitarios (ver registro), el índice se importa recién cuando
+    # hace falta, para no demorar el inicio.
+    from indice_repartos import abrir_indice, ARCHIVO_INDICE, DIFICULTADES
+    indice = abrir_indice(archivo or ARCHIVO_INDICE)
+    if not indice:
+        return None
+    try:
+        cantidades = indice.cantidades(juego)
+        if not any(cantidades):
+            return None
+        print("REPARTOS GANABLES:")
+        for i, (dificultad, cantidad) in enumerate(zip(DIFICULTADES, cantidades)):
+            print(i + 1, dificultad, "({})".format(cantidad))
+        print("Otra cosa para un reparto cualquiera")
+        try:
+            n = int(input('Opción: '))
+        except ValueError:
+            return None
+
+        if n <= 0 or n > len(DIFICULTADES):
+            return None
+
+        return indice.al_azar(juego, n - 1)
+    finally:
+        indice.cerrar()
+
+def armar_juego(juego, seed):
+    """Crea la mesa y el solitario del juego y lo arma con la semilla. Si seed
+    es un string "#N" se arma el reparto numerado N (ver repartos.Azar)."""
+    numero = int(seed[1:]) if isinstance(seed, str) else None
+    random.seed(seed if numero is None else numero)
+
+    mesa = Mesa()
+
+    constructor, parametros = SOLITARIOS[juego]
+    if parametros:
+        solitario = constructor(mesa, *parametros)
+    else:
+        solitario = constructor(mesa)
+
+    if numero is not None:
+        solitario.azar = Azar(numero)
+    perfil.instrumentar_solitario(solitario)
+    solitario.armar()
+    return mesa, solitario
+
+def jugar(solitario, jugada):
+    """Efectúa la jugada en el solitario. Con el perfilado activo (ver
+    perfil) registra además cuánto tardó."""
+    if not perfil.activo:
+        solitario.jugar(jugada)
+        return
+    inicio = time.perf_counter()
+    try:
+        solitario.jugar(jugada)
+    finally:
+        perfil.registrar_jugada(jugada, time.perf_counter() - inicio)
+
+def reproducir(mesa, solitario, comandos):
+    """Aplica los comandos al solitario sin imprimir nada, salteando los que
+    fallen. Cada comando distinto se parsea una sola vez.
+    Devuelve la cantidad de jugadas efectuadas."""
+    jugadas = {}
+    efectuadas = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for comando in comandos:
+            if solitario.termino():
+                break
+            if comando not in jugadas:
+                jugadas[comando] = mesa.parsear_jugada(comando)
+            jugada = jugadas[comando]
+            if not jugada:
+                continue
+            if jugada[0][0] == SALIR:
+                break
+            try:
+                jugar(solitario, jugada)
+            except SolitarioError:
+                continue
+            efectuadas += 1
+    return efectuadas
+
+def verificar(archivo):
+    """Reproduce un log sin interacción e informa la velocidad alcanzada."""
+    r = recuperar(archivo)
+    if not r:
+        return
+    seed, juego, comandos = r
+    mesa, solitario = armar_juego(juego, seed)
+
+    inicio = time.perf_counter()
+    efectuadas = reproducir(mesa, solitario, comandos)
+    segundos = time.perf_counter() - inicio
+
+    mesa.imprimir()
+    print()
+    print("{}: {} comandos, {} jugadas en {:.4f} s ({:.0f} jugadas/s)".format(
+        juego, len(comandos), efectuadas, segundos, efectuadas / segundos if segundos else 0))
+
+def procesar(mesa, solitario, entrada, salida):
+    """Modo en lote: lee comandos de entrada (uno o varios por línea,
+    separados por SEPARADOR_COMANDOS) y los aplica al solitario sin dibujar la
+    mesa. Por cada comando escribe en salida una línea JSON con el comando,
+    si se pudo jugar (ok), el error si no, la huella de la posición (ver
+    instantanea.huella) y si terminó el juego. COMANDO_MESA escribe la mesa
+    dibujada ({"mesa": texto}). Termina con SALIR o al acabarse la entrada.
+    Lo que impriman los solitarios se descarta.
+    Devuelve la cantidad de jugadas efectuadas."""
+    jugadas = {}
+    efectuadas = 0
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        for linea in entrada:
+            for comando in linea.split(SEPARADOR_COMANDOS):
+                comando = comando.strip()
+                if not comando:
+                    continue
+                if comando == COMANDO_MESA:
+                    with contextlib.redirect_stdout(io.StringIO()) as texto:
+                        mesa.imprimir()
+                    salida.write(json.dumps({'mesa': texto.getvalue()}) + '\n')
+                    continue
+                if comando not in jugadas:
+                    jugadas[comando] = mesa.parsear_jugada(comando)
+                jugada = jugadas[comando]
+                error = None
+                if not jugada:
+                    error = "Comando incorrecto"
+                elif jugada[0][0] == SALIR:
+                    return efectuadas
+                else:
+                    try:
+                        jugar(solitario, jugada)
+                        efectuadas += 1
+                    except SolitarioError as e:
+                        error = str(e)
+                salida.write(json.dumps({'comando': comando, 'ok': error is None, 'error': error,
+                                         'estado': huella(mesa, solitario), 'termino': bool(solitario.termino())}) + '\n')
+            # Se escribe lo de cada línea enseguida, para quien espera las
+            # respuestas del otro lado de un pipe.
+            salida.flush()
+    return efectuadas
+
+def lote(juego, seed, archivo=None):
+    """Arma el juego con la semilla y le pasa los comandos de archivo (o de la
+    entrada estándar) con procesar()."""
+    if juego not in SOLITARIOS:
+        print("ERROR: No existe el solitario", juego, file=sys.stderr)
+        return
+    salida = sys.stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        mesa, solitario = armar_juego(juego, seed)
+    if archivo is None:
+        procesar(mesa, solitario, sys.stdin, salida)
+        return
+    with open(archivo) as entrada:
+        procesar(mesa, solitario, entrada, salida)
+
 def main():
+    perfil.activar_desde_entorno()
+    if len(sys.argv) >= 3 and sys.argv[1] == '--perfil':
+        # main.py --perfil ARCHIVO [opciones]: como las opciones de siempre,
+        # volcando el perfil en ARCHIVO (ver perfil).
+        perfil.activar(sys.argv[2])
+        del sys.argv[1:3]
+
+    if len(sys.argv) in (2, 3) and sys.argv[1] == '--verify':
+        verificar(sys.argv[2] if len(sys.argv) == 3 else LOGFILE)
+        return
+
+    if len(sys.argv) in (4, 5) and sys.argv[1] == '--batch':
+        # main.py --batch JUEGO SEMILLA [ARCHIVO], SEMILLA puede ser "#N".
+        try:
+            seed = leer_semilla(sys.argv[3])
+        except ValueError:
+            print("ERROR: La semilla tiene que ser un entero o #N", file=sys.stderr)
+            return
+        lote(sys.argv[2], seed, sys.argv[4] if len(sys.argv) == 5 else None)
+        return
+
     resume = False
-    seed = int(datetime.datetime.now().timestamp())
+    seed = int(time.time())
     juego = None
     comandos = []
 
+    if len(sys.argv) == 3 and sys.argv[1] == '-reparto':
+        try:
+            seed = '#{}'.format(int(sys.argv[2]))
+        except ValueError:
+            print("ERROR: El número de reparto tiene que ser un entero")
+            return
+
     if len(sys.argv) == 2 and sys.argv[1] == '-resume':
         r = recuperar()
         if r:
             resume = True
             seed, juego, comandos = r
 
-    random.seed(seed)
-
     logfile = None
     if resume:
         try:
@@ -71,36 +273,43 @@ def main():
         juego = pedir_juego(SOLITARIOS.keys())
         if not juego:
             return
+        if not isinstance(seed, str):
+            reparto = pedir_reparto(juego)
+            if reparto is not None:
+                seed = '#{}'.format(reparto)
 
         try:
             logfile = open(LOGFILE, 'w')
         except IOError:
             pass
 
+        # Un checkpoint de una partida anterior ya no sirve.
+        try:
+            os.remove(ARCHIVO_CHECKPOINT)
+        except OSError:
+            pass
+
         loguear(logfile, seed)
         loguear(logfile, juego)
 
     print()
     print("JUGANDO " + juego)
+    if isinstance(seed, str):
+        print("Reparto " + seed)
     print()
 
-    mesa = Mesa()
-
-    constructor, parametros = SOLITARIOS[juego]
-    if parametros:
-        solitario = constructor(mesa, *parametros)
-    else:
-        solitario = constructor(mesa)
-
-    solitario.armar()
+    mesa, solitario = armar_juego(juego, seed)
+    if comandos:
+        # Se carga el último checkpoint y se avanza el juego recuperado hasta
+        # el final del log sin dibujarlo.
+        desde = cargar_checkpoint(mesa, solitario, seed, juego, len(comandos))
+        reproducir(mesa, solitario, comandos[desde:])
+        print("Se recuperaron {} comandos ({} desde el checkpoint)".format(len(comandos), desde))
+        print()
+    registrados = len(comandos)
     mesa.imprimir()
     while not solitario.termino():
-        if comandos:
-            comando = comandos.pop(0)
-            print("COMANDO:", comando)
-        else:
-            comando = input(mesa.mensaje_jugada())
-            resume = False
+        comando = input(mesa.mensaje_jugada())
 
         jugada = mesa.parsear_jugada(comando)
 
@@ -111,17 +320,24 @@ def main():
         if jugada[0][0] == SALIR:
             break
 
-        if not resume:
-            loguear(logfile, comando)
+        loguear(logfile, comando)
+        registrados += 1
 
         try:
-            solitario.jugar(jugada)
+            jugar(solitario, jugada)
         except SolitarioError as e:
             print("ERROR:", e)
-            continue
+        else:
+            print()
+            mesa.imprimir()
 
-        print()
-        mesa.imprimir()
+        if logfile and registrados % CADA_CHECKPOINT == 0:
+            # El log tiene que estar escrito hasta donde llega el checkpoint.
+            logfile.flush()
+            try:
+                guardar_checkpoint(mesa, solitario, seed, juego, registrados)
+            except IOError:
+                pass
 
     print()
     print("Juego Terminado!")
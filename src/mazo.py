@@ -5,42 +5,60 @@ import random
 MISMO_COLOR_NEGRO = 0
 MISMO_COLOR_ROJO = 1
 
-def crear_mazo(mazos=1, palos=4):
+# Palos de los mazos de 2 palos, según el color.
+PALOS_COLOR = {
+    MISMO_COLOR_NEGRO: (PICAS, TREBOLES),
+    MISMO_COLOR_ROJO: (CORAZONES, DIAMANTES),
+}
+
+# Plantillas de mazos ya armados, por (mazos, palos, palo o color): tuplas de
+# códigos de cartas boca abajo, del tope a la base (el orden en que se las
+# mezcla).
+_PLANTILLAS = {}
+
+
+def plantilla(mazos=1, palos=4, palo=PICAS, mismo_color=MISMO_COLOR_NEGRO):
+    """Devuelve la tupla de códigos del mazo sin mezclar, del tope a la base.
+    palo es el único palo de los mazos de 1 palo y mismo_color el color de los
+    de 2 palos; en los demás casos no se usan."""
+    if palos == 4:
+        clave = (mazos, palos, None)
+    elif palos == 2:
+        clave = (mazos, palos, mismo_color)
+    else:
+        clave = (mazos, palos, palo)
+    if clave not in _PLANTILLAS:
+        codigos = []
+        for v in range(52 * mazos):
+            # Cada serie de 13 cartas es del 1 al 13 de un palo.
+            serie = v // 13
+            if palos == 4:
+                palo_carta = serie % 4
+            elif palos == 2:
+                palo_carta = PALOS_COLOR[mismo_color][serie % 2]
+            else:
+                palo_carta = palo
+            codigos.append(codificar(v % 13 + 1, palo_carta, True))
+        _PLANTILLAS[clave] = tuple(reversed(codigos))
+    return _PLANTILLAS[clave]
+
+
+def crear_mazo(mazos=1, palos=4, azar=random):
     """Devuelve una PilaCartas con las cartas boca abajo y mezcladas.
     Cada mazo de los mazos tiene 52 cartas, y puede ser completado con 1, 2 o 4 palos.
     En caso de que estén los 4 palos el mazo se conformará con la serie del 1 al 13
     para cada uno de ellos, en caso de ser sólo 2 palos serán 2 veces la serie 1 al 13
     para dos palos del mismo color y en caso de ser 1 sólo palo será 4 veces la serie 1 al 13
-    para ese palo."""
-   
+    para ese palo.
+    azar es el generador con el que se mezcla: el módulo random o un
+    repartos.Azar para los repartos numerados."""
+    mismo_color = azar.randint(0,1)
+    palo_random = azar.randint(0,3)
+
+    # Se copia la plantilla y se la mezcla desde el tope, como mezclar().
+    codigos = list(plantilla(mazos, palos, palo_random, mismo_color))
+    azar.shuffle(codigos)
+    codigos.reverse()
     mazo = PilaCartas()
-    mismo_color = random.randint(0,1)
-    palo_random = random.randint(0,3)
-    palo = 0
-    i = 0
-    for v in range(52 * mazos):
-	    if palos == 4:
-		    carta = Carta((v % 13) + 1,palo)
-		    mazo.apilar(carta)
-		    if (v % 13)  == 0 and v != 0:
-			    palo += 1
-	    if palos == 2:
-		    if MISMO_COLOR_ROJO:
-			    palo = [CORAZONES, DIAMANTES]
-			    carta = Carta((v % 13) + 1,palo[i % 2])
-			    mazo.apilar(carta)
-			    if (v % 13)  == 0 and v != 0:
-				    i += 1
-		    if MISMO_COLOR_NEGRO:
-			    palo = [PICAS, TREBOLES]
-			    i = 0
-			    carta = Carta((v % 13) + 1,palo[i % 2])
-			    mazo.apilar(carta)
-			    if (v % 13)  == 0 and v != 0:
-				    i += 1
-	    if palos == 1:
-		    carta = Carta ((v % 13) + 1, palo_random)
-		    mazo.apilar(carta)
-    mazo.mezclar()
+    mazo.reemplazar(codigos)
     return mazo
-
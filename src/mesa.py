@@ -1,4 +1,6 @@
 from pila_cartas import *
+import carta as _carta
+import os, sys
 
 # Constantes que describen las opciones de entrada del usuario.
 FUNDACION = 0
@@ -6,6 +8,8 @@ PILA_TABLERO = 1
 MAZO = 2
 DESCARTE = 3
 SALIR = 4
+DESHACER = 5
+REHACER = 6
 
 
 class Mesa:
@@ -24,21 +28,128 @@ class Mesa:
         self.pilas_tablero = []
         self.mazo = None
         self.descarte = None
+        # Para el dibujo incremental: las líneas del último cuadro dibujado
+        # (None si todavía no se dibujó) y por cada pila (por id) la terna
+        # (pila, versión, texto) con la que se la dibujó.
+        self._cuadro = None
+        self._textos = {}
+        # Índice de fundaciones: para cada código de carta, una máscara de
+        # bits con las fundaciones que la aceptan (bit i para la fundación
+        # i). Se actualiza al consultarlo, sólo para las fundaciones que
+        # cambiaron de versión. Por cada fundación indexada se guarda la
+        # pila, la versión y los códigos que acepta.
+        self._aceptan = [0] * CANTIDAD_CODIGOS
+        self._indice_pilas = []
+        self._indice_versiones = []
+        self._indice_codigos = []
+
+    def pilas(self):
+        """Devuelve la lista de todas las pilas de la mesa: fundaciones, pilas
+        del tablero, mazo y descarte (si los hay)."""
+        pilas = self.fundaciones + self.pilas_tablero
+        return pilas + [pila for pila in (self.mazo, self.descarte) if pila is not None]
+
+    def fundaciones_para(self, carta):
+        """Devuelve una máscara de bits con las fundaciones (el bit i para la
+        fundación i) sobre las que puede apilarse la carta, que puede ser una
+        Carta o su código."""
+        self._actualizar_indice()
+        return self._aceptan[codigo(carta)]
+
+    def fundacion_para(self, carta):
+        """Devuelve el índice de la primera fundación sobre la que puede
+        apilarse la carta, o None si no hay ninguna."""
+        mascara = self.fundaciones_para(carta)
+        if not mascara:
+            return None
+        return (mascara & -mascara).bit_length() - 1
+
+    def topes_jugables(self):
+        """Devuelve los índices de las pilas del tablero cuyo tope puede
+        apilarse en alguna fundación (por ejemplo, para dar pistas)."""
+        self._actualizar_indice()
+        return [i for i, pila in enumerate(self.pilas_tablero)
+                if pila.es_desapilable() and self._aceptan[pila.codigo_tope()]]
+
+    def _actualizar_indice(self):
+        """Pone al día el índice de fundaciones."""
+        versiones = [pila.version for pila in self.fundaciones]
+        if versiones == self._indice_versiones and self._indice_pilas == self.fundaciones:
+            return
+        if self._indice_pilas != self.fundaciones:
+            # Cambiaron las fundaciones de la mesa: se indexan de cero.
+            self._aceptan = [0] * CANTIDAD_CODIGOS
+            self._indice_pilas = list(self.fundaciones)
+            self._indice_versiones = [None] * len(versiones)
+            self._indice_codigos = [()] * len(versiones)
+        aceptan = self._aceptan
+        for i, pila in enumerate(self._indice_pilas):
+            if self._indice_versiones[i] == versiones[i]:
+                continue
+            bit = 1 << i
+            for c in self._indice_codigos[i]:
+                aceptan[c] &= ~bit
+            codigos = self._indice_codigos[i] = _codigos_aceptados(pila)
+            for c in codigos:
+                aceptan[c] |= bit
+        self._indice_versiones = versiones
 
     def imprimir(self):
-        """Imprime por pantalla una representación de la mesa actual."""
+        """Imprime por pantalla una representación de la mesa actual.
+        Cada cuadro se arma en un solo buffer y se escribe de una vez. En una
+        terminal con COLOR activado sólo se redibujan, con secuencias ANSI de
+        posicionamiento del cursor, las líneas que cambiaron desde el cuadro
+        anterior; si no, se imprime la mesa completa."""
+        lineas = self._lineas()
+        if not _terminal_ansi():
+            self._cuadro = None
+            sys.stdout.write(''.join([linea + '\n' for linea in lineas]))
+            return
+
+        if self._cuadro is None:
+            # Primer cuadro: se limpia la pantalla y se dibuja desde arriba.
+            salida = ['\x1b[H\x1b[2J'] + [linea + '\n' for linea in lineas]
+        else:
+            salida = []
+            for i, linea in enumerate(lineas):
+                if i >= len(self._cuadro) or self._cuadro[i] != linea:
+                    salida.append('\x1b[{};1H{}\x1b[K'.format(i + 1, linea))
+            # Se borra lo que quedó debajo de la mesa (mensajes y entradas
+            # del usuario, o líneas del cuadro anterior si era más largo).
+            salida.append('\x1b[{};1H\x1b[J'.format(len(lineas) + 1))
+        self._cuadro = lineas
+        sys.stdout.write(''.join(salida))
+        sys.stdout.flush()
+
+    def _lineas(self):
+        """Devuelve las líneas de texto que representan la mesa. Sólo se
+        vuelven a convertir a texto las pilas que cambiaron de versión."""
+        lineas = []
         if self.fundaciones:
-            print("FUNDACIONES:")
+            lineas.append("FUNDACIONES:")
             for i,fundacion in enumerate(self.fundaciones):
-                print(i + 1, fundacion)
+                lineas.append('{} {}'.format(i + 1, self._texto(fundacion)))
         if self.pilas_tablero:
-            print("TABLERO:")
+            lineas.append("TABLERO:")
             for i,pila in enumerate(self.pilas_tablero):
-                print(chr(ord('A')+i), pila)
-        print("MAZO")
-        print('M', self.mazo)
+                lineas.append('{} {}'.format(chr(ord('A')+i), self._texto(pila)))
+        lineas.append("MAZO")
+        lineas.append('M {}'.format(self._texto(self.mazo)))
         if self.descarte:
-            print('N', self.descarte)
+            lineas.append('N {}'.format(self._texto(self.descarte)))
+        return lineas
+
+    def _texto(self, pila):
+        """Devuelve str(pila), reutilizando el del cuadro anterior si la pila
+        no cambió."""
+        if pila is None:
+            return 'None'
+        anterior = self._textos.get(id(pila))
+        if anterior and anterior[0] is pila and anterior[1] == pila.version:
+            return anterior[2]
+        texto = str(pila)
+        self._textos[id(pila)] = (pila, pila.version, texto)
+        return texto
 
     def mensaje_jugada(self):
         """Retorna el mensaje que debe mostrársele al usuario para el input
@@ -56,7 +167,7 @@ class Mesa:
         if self.descarte:
             msg += ' N'
 
-        msg += ' Q: '
+        msg += ' Z Y Q: '
 
         return msg
 
@@ -64,7 +175,8 @@ class Mesa:
         """Dada la entrada inp del usuario se devuelven las acciones indicadas.
         En funcionamiento normal devuelve una lista de 1 o 2 elementos.
         Cada elemento es un par (PILA, índice) donde PILA es un valor entre
-        FUNDACION, MAZO, DESCARTE, PILA_TABLERO o SALIR. El índice es el índice
+        FUNDACION, MAZO, DESCARTE, PILA_TABLERO, SALIR, DESHACER (Z) o REHACER
+        (Y). El índice es el índice
         de la FUNDACION o de la PILA_TABLERO de corresponder o 0 si no.
         En caso de falla devuelve None."""
         inp = inp.upper()
@@ -82,9 +194,50 @@ class Mesa:
                 jugada.append((DESCARTE, 0))
             elif c == 'Q':
                 jugada.append((SALIR, 0))
+            elif c == 'Z':
+                jugada.append((DESHACER, 0))
+            elif c == 'Y':
+                jugada.append((REHACER, 0))
             elif c >= 'A' and c < chr(ord('A') + len(self.pilas_tablero)):
                 jugada.append((PILA_TABLERO, ord(c) - ord('A')))
             else:
                 return None
         return jugada
 
+
+
+def _terminal_ansi():
+    """Indica si la salida es una terminal que entiende secuencias ANSI y
+    está activado COLOR (ver carta)."""
+    if not _carta.COLOR or os.environ.get('TERM', 'dumb') == 'dumb':
+        return False
+    try:
+        return sys.stdout.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+# Códigos aceptados por una pila, por (tabla del criterio, código del tope) o
+# por valor_inicial si está vacía. Las tablas de criterio() son únicas por
+# criterio, así que su id sirve de clave.
+_CODIGOS_ACEPTADOS = {}
+_TODOS_LOS_CODIGOS = tuple(range(CANTIDAD_CODIGOS))
+
+
+def _codigos_aceptados(pila):
+    """Devuelve la tupla de códigos de carta que pueden apilarse sobre pila
+    (ver PilaCartas.puede_apilar)."""
+    if pila.es_vacia():
+        if pila.valor_inicial is None:
+            return _TODOS_LOS_CODIGOS
+        clave = ('valor_inicial', pila.valor_inicial)
+    elif pila.criterio_apilar is None:
+        return _TODOS_LOS_CODIGOS
+    elif not hasattr(pila.criterio_apilar, 'tabla'):
+        # Un criterio sin tabla: se prueban todos los códigos.
+        return tuple(c for c in _TODOS_LOS_CODIGOS if pila.puede_apilar(c))
+    else:
+        clave = (id(pila.criterio_apilar.tabla), pila.codigo_tope())
+    if clave not in _CODIGOS_ACEPTADOS:
+        _CODIGOS_ACEPTADOS[clave] = tuple(c for c in _TODOS_LOS_CODIGOS if pila.puede_apilar(c))
+    return _CODIGOS_ACEPTADOS[clave]
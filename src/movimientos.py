@@ -0,0 +1,68 @@
+from mesa import *
+
+
+class Movimientos:
+    """Lista de jugadas legales de un solitario, actualizada en forma
+    incremental.
+    Se construye con el solitario, su mesa y todas las jugadas candidatas
+    (tuplas de pares (PILA, índice), ver mesa). Cada candidata depende de las
+    pilas que nombra y puede depender también de los atributos ESTADO del
+    solitario (como pedir el mazo en Reyerta, que depende de cuántas veces se
+    lo recorrió). Sólo se vuelven a chequear (con solitario.puede_jugar) las
+    candidatas de las pilas que cambiaron de versión desde la última
+    consulta, y las que dependen de ESTADO si cambió alguno de sus valores."""
+
+    def __init__(self, solitario, mesa, candidatas, de_estado=None):
+        """Crea el índice. de_estado son las candidatas que dependen de
+        ESTADO (por omisión, todas). Todas las candidatas se chequean en la
+        primera consulta."""
+        self.solitario = solitario
+        self.legales = {}
+        self.nombres = getattr(solitario, 'ESTADO', ())
+        self.de_estado = list(candidatas if de_estado is None else de_estado)
+        # Valores de ESTADO en la última consulta.
+        self.estado = None
+        # Una entrada [pila, versión vista, candidatas que dependen de ella]
+        # por cada pila que aparece en alguna candidata.
+        self.pilas = []
+        entradas = {}
+        for jugada in candidatas:
+            for pila in _pilas_jugada(mesa, jugada):
+                if id(pila) not in entradas:
+                    entradas[id(pila)] = [pila, None, []]
+                    self.pilas.append(entradas[id(pila)])
+                entradas[id(pila)][2].append(jugada)
+
+    def jugadas(self):
+        """Devuelve la lista de jugadas legales en el estado actual."""
+        revisar = set()
+        estado = tuple([getattr(self.solitario, nombre) for nombre in self.nombres])
+        if estado != self.estado:
+            self.estado = estado
+            revisar.update(self.de_estado)
+        for entrada in self.pilas:
+            pila = entrada[0]
+            if pila.version != entrada[1]:
+                entrada[1] = pila.version
+                revisar.update(entrada[2])
+        for jugada in revisar:
+            if self.solitario.puede_jugar(jugada):
+                self.legales[jugada] = None
+            else:
+                self.legales.pop(jugada, None)
+        return list(self.legales)
+
+
+def _pilas_jugada(mesa, jugada):
+    """Devuelve las PilaCartas que nombra una jugada."""
+    pilas = []
+    for pila, i in jugada:
+        if pila == FUNDACION:
+            pilas.append(mesa.fundaciones[i])
+        elif pila == PILA_TABLERO:
+            pilas.append(mesa.pilas_tablero[i])
+        elif pila == MAZO:
+            pilas.append(mesa.mazo)
+        elif pila == DESCARTE:
+            pilas.append(mesa.descarte)
+    return pilas
@@ -0,0 +1,150 @@
+import atexit, functools, json, os, time
+
+# Perfilado opcional de los caminos calientes del juego. Mientras no se
+# activa no se envuelve nada: lo único que cuesta es preguntar por activo.
+# Se activa con la variable de entorno VARIABLE_ENTORNO (o con main.py
+# --perfil ARCHIVO) y al salir vuelca lo medido en el archivo: en JSON si
+# termina en .json y si no en formato de pilas colapsadas ("a;b;c
+# microsegundos" por línea, el que leen flamegraph.pl y speedscope).
+VARIABLE_ENTORNO = 'SOLITARIO_PERFIL'
+
+# Histograma de la latencia de cada tipo de jugada: la cubeta i cuenta las
+# que tardaron menos de 2 ** i microsegundos (la última, el resto).
+CUBETAS = 24
+
+activo = False
+
+# Por nombre de función: [llamadas, segundos acumulados].
+_llamadas = {}
+# Por camino de llamadas "a;b;c": segundos propios de c (sin sus hijas).
+_caminos = {}
+# Por tipo de jugada: [cantidad, segundos, histograma].
+_jugadas = {}
+# Llamadas en curso: [nombre, segundos de sus hijas].
+_marcos = []
+_archivo = None
+
+
+def activar(archivo):
+    """Instrumenta los caminos calientes y vuelca lo medido en archivo al
+    terminar el programa. Sólo cuenta lo que se construya después (las pilas
+    toman sus criterios al crearse), así que hay que llamarla antes de armar
+    el juego. Los solitarios se instrumentan con instrumentar_solitario()."""
+    global activo, _archivo
+    if activo:
+        return
+    activo = True
+    _archivo = archivo
+
+    import pila_cartas, mesa
+    for metodo in ('apilar', 'desapilar', 'mover'):
+        instrumentar(pila_cartas.PilaCartas, metodo)
+    instrumentar(mesa.Mesa, 'imprimir')
+
+    con_codigos = pila_cartas._con_codigos
+    def _con_codigos(criterio):
+        criterio = con_codigos(criterio)
+        return criterio and _medida('criterio', criterio)
+    pila_cartas._con_codigos = _con_codigos
+
+    def contar_error(error, *args):
+        contar('SolitarioError')
+        Exception.__init__(error, *args)
+    pila_cartas.SolitarioError.__init__ = contar_error
+
+    atexit.register(volcar)
+
+
+def activar_desde_entorno():
+    """Llama a activar() si está definida VARIABLE_ENTORNO."""
+    archivo = os.environ.get(VARIABLE_ENTORNO)
+    if archivo:
+        activar(archivo)
+
+
+def instrumentar(clase, metodo, nombre=None):
+    """Reemplaza clase.metodo por una versión que mide sus llamadas, como
+    "Clase.metodo" (o nombre). No hace nada si ya estaba instrumentado."""
+    funcion = getattr(clase, metodo)
+    if getattr(funcion, 'perfilada', False):
+        return
+    setattr(clase, metodo, _medida(nombre or '{}.{}'.format(clase.__name__, metodo), funcion))
+
+
+def instrumentar_solitario(solitario):
+    """Instrumenta el jugar de la clase del solitario si el perfilado está
+    activo."""
+    if activo:
+        instrumentar(type(solitario), 'jugar')
+
+
+def _medida(nombre, funcion):
+    """Devuelve funcion envuelta para sumar sus llamadas y su tiempo, y el
+    tiempo propio en el camino de llamadas medidas en el que se la llamó."""
+    contadores = _llamadas.setdefault(nombre, [0, 0.0])
+
+    @functools.wraps(funcion)
+    def medida(*args, **kwargs):
+        marco = [nombre, 0.0]
+        _marcos.append(marco)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            segundos = time.perf_counter() - inicio
+            camino = ';'.join(m[0] for m in _marcos)
+            _marcos.pop()
+            contadores[0] += 1
+            contadores[1] += segundos
+            _caminos[camino] = _caminos.get(camino, 0.0) + segundos - marco[1]
+            if _marcos:
+                _marcos[-1][1] += segundos
+    medida.perfilada = True
+    return medida
+
+
+def contar(nombre):
+    """Suma una llamada a nombre, sin medir tiempo."""
+    _llamadas.setdefault(nombre, [0, 0.0])[0] += 1
+
+
+def registrar_jugada(jugada, segundos):
+    """Suma la latencia de una jugada (una lista de pares (PILA, numero), ver
+    mesa) a su tipo: los tipos de pila que intervienen."""
+    from mesa import FUNDACION, PILA_TABLERO, MAZO, DESCARTE, DESHACER, REHACER
+    nombres = {FUNDACION: 'fundacion', PILA_TABLERO: 'tablero', MAZO: 'mazo',
+               DESCARTE: 'descarte', DESHACER: 'deshacer', REHACER: 'rehacer'}
+    tipo = '->'.join(nombres.get(pila, str(pila)) for pila, numero in jugada)
+    datos = _jugadas.setdefault(tipo, [0, 0.0, [0] * CUBETAS])
+    datos[0] += 1
+    datos[1] += segundos
+    datos[2][min(int(segundos * 1e6).bit_length(), CUBETAS - 1)] += 1
+
+
+def resumen():
+    """Devuelve lo medido como un dict apto para JSON."""
+    return {
+        'llamadas': {nombre: {'cantidad': c, 'segundos': s} for nombre, (c, s) in sorted(_llamadas.items()) if c},
+        'jugadas': {tipo: {'cantidad': c, 'segundos': s,
+                           'histograma': [[2 ** i, n] for i, n in enumerate(histograma) if n]}
+                    for tipo, (c, s, histograma) in sorted(_jugadas.items())},
+    }
+
+
+def pilas_colapsadas():
+    """Devuelve las líneas "a;b;c microsegundos" de los tiempos propios de
+    cada camino de llamadas medidas."""
+    return ['{} {}'.format(camino, round(segundos * 1e6)) for camino, segundos in sorted(_caminos.items())]
+
+
+def volcar(archivo=None):
+    """Escribe lo medido en archivo (por omisión, el de activar())."""
+    archivo = archivo or _archivo
+    try:
+        with open(archivo, 'w') as f:
+            if archivo.endswith('.json'):
+                json.dump(resumen(), f, indent=1, sort_keys=True)
+            else:
+                f.writelines(linea + '\n' for linea in pilas_colapsadas())
+    except IOError:
+        pass
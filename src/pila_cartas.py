@@ -1,6 +1,5 @@
 from carta import *
-from pila import *
-import random
+import array, random
 
 class SolitarioError(Exception):
     """Tipo de Exception para todos los errores del Solitario."""
@@ -8,8 +7,17 @@ class SolitarioError(Exception):
     pass
 
 
+# Cambios que una PilaCartas informa a su historial (ver historial.py), para
+# poder deshacerlos.
+APILADA, DESAPILADA, VOLTEADA, RECIBIDAS, REEMPLAZADA = range(5)
+
+
 class PilaCartas:
-    """Representa una pila de cartas en el tablero."""
+    """Representa una pila de cartas en el tablero. Las cartas se guardan como
+    sus códigos enteros (ver carta.codificar()) en un array de bytes; tope(),
+    desapilar(), etc. devuelven Cartas nuevas armadas a partir del código.
+    Modificar esas Cartas no cambia la pila: para dar vuelta el tope se usa
+    voltear_tope() y para cambiar las cartas, reemplazar()."""
 
     def __init__(self, pila_visible=False, valor_inicial=None, puede_desapilar=True, criterio_apilar=None, criterio_mover=None):
         """Se construye una pila vacía. El comportamiento estará regido por:
@@ -34,41 +42,202 @@ class PilaCartas:
         self.puede_desapilar = puede_desapilar
         self.criterio_apilar = criterio_apilar
         self.criterio_mover = criterio_mover
-        self.cartas = Pila()
+        # Códigos de las cartas, de base a tope.
+        self.cartas = array.array('B')
+        # Para cada carta de la pila, el largo de la secuencia movible en
+        # bloque (según criterio_mover) que termina en ella.
+        self.corridas = array.array('B')
+        # Se incrementa con cada cambio en la pila, para que otros puedan
+        # saber si cambió desde la última vez que la miraron.
+        self.version = 0
+        # Historial al que se informan los cambios, o None.
+        self.historial = None
+
+    # Internamente los criterios se llaman siempre con códigos: los de
+    # criterio() los aceptan tal cual y los demás se envuelven para que
+    # reciban Cartas.
+
+    @property
+    def criterio_apilar(self):
+        return self._criterio_apilar
+
+    @criterio_apilar.setter
+    def criterio_apilar(self, criterio):
+        self._criterio_apilar = criterio
+        self._apilar = _con_codigos(criterio)
+
+    @property
+    def criterio_mover(self):
+        return self._criterio_mover
+
+    @criterio_mover.setter
+    def criterio_mover(self, criterio):
+        self._criterio_mover = criterio
+        self._mover = _con_codigos(criterio)
 
     def es_vacia(self):
         """Indica si la pila se encuentra vacía."""
-        return self.cartas.esta_vacia()
+        return not self.cartas
 
     def tope(self):
-        """Devuelve la carta tope de la pila.
+        """Devuelve una copia de la carta tope de la pila: voltearla o
+        cambiarla no modifica la pila (ver voltear_tope()).
+        Levanta SolitarioError en caso de error."""
+        return Carta.desde_codigo(self.codigo_tope())
+
+    def codigo_tope(self):
+        """Devuelve el código de la carta tope de la pila.
         Levanta SolitarioError en caso de error."""
-        if self.cartas.esta_vacia():
+        if not self.cartas:
             raise SolitarioError("La pila no tiene cartas.")
-        return self.cartas.ver_tope()
+        return self.cartas[-1]
 
     def apilar(self, carta, forzar=False):
         """Apila una carta en la pila. Si forzar es True desactiva los chequeos
-        sobre el valor_inicial y el criterio_apilar.
+        sobre el valor_inicial y el criterio_apilar. La carta puede ser una
+        Carta o su código entero.
         Levanta SolitarioError en caso de no poder apilar."""
-        if not forzar:
-            if self.valor_inicial != None and self.es_vacia() and carta.valor != self.valor_inicial:
-                raise SolitarioError("No es posible apilar la carta. No coinciden los valores.")
-            elif self.criterio_apilar != None and not self.es_vacia() and not self.criterio_apilar(self.tope(), carta):
-                raise SolitarioError("No es posible apilar la carta. No cumple el criterio para apilar.")
-            self.cartas.apilar(carta)
-        else:
-            self.cartas.apilar(carta)
-
+        if carta.__class__ is not int:
+            carta = carta.codigo
+        if not forzar and not self.puede_apilar(carta):
+            raise SolitarioError(self.error_apilar(carta))
+        self.corridas.append(self._corrida_sobre(carta))
+        self.cartas.append(carta)
+        self.version += 1
+        if self.historial is not None:
+            self.historial.registrar(APILADA, self, carta)
 
     def desapilar(self):
         """Desapila una carta. Levanta SolitarioError en caso de no poder
         desapilar."""
-        if not self.puede_desapilar:
-            raise SolitarioError("La pila no puede desapilar.")
-        if self.es_vacia():
+        if not self.es_desapilable():
+            if not self.puede_desapilar:
+                raise SolitarioError("La pila no puede desapilar.")
             raise SolitarioError("La pila de cartas esta vacia.")
-        return self.cartas.desapilar()
+        codigo = self._quitar_tope()
+        if self.historial is not None:
+            self.historial.registrar(DESAPILADA, self, codigo)
+        return Carta.desde_codigo(codigo)
+
+    def _quitar_tope(self):
+        """Desapila la carta del tope sin ningún chequeo. Devuelve su código."""
+        self.corridas.pop()
+        self.version += 1
+        return self.cartas.pop()
+
+    def repartir(self, cantidad=None):
+        """Desapila sin chequeos las cantidad cartas del tope (por omisión,
+        todas) y las devuelve en el orden en que las daría desapilar(), del
+        tope hacia abajo."""
+        if cantidad is None:
+            cantidad = len(self.cartas)
+        antes = self.codigos() if self.historial is not None else None
+        base = len(self.cartas) - cantidad
+        if base < 0:
+            raise SolitarioError("La pila no tiene suficientes cartas.")
+        bloque = [Carta.desde_codigo(c) for c in reversed(self.cartas[base:])]
+        del self.cartas[base:]
+        del self.corridas[base:]
+        self.version += 1
+        if self.historial is not None:
+            self.historial.registrar(REEMPLAZADA, self, antes, self.codigos())
+        return bloque
+
+    def apilar_varios(self, cartas):
+        """Apila sin chequeos las cartas (de base a tope), de una sola vez.
+        Las cartas pueden ser Cartas o códigos enteros."""
+        antes = self.codigos() if self.historial is not None else None
+        self._extender([carta if carta.__class__ is int else carta.codigo for carta in cartas])
+        self.version += 1
+        if self.historial is not None:
+            self.historial.registrar(REEMPLAZADA, self, antes, self.codigos())
+
+    def _extender(self, codigos):
+        """Apila los codigos sobre la pila calculando sus corridas, sin
+        chequeos ni incrementar la versión."""
+        base = len(self.cartas)
+        self.cartas.extend(codigos)
+        for i in range(base, len(self.cartas)):
+            self.corridas.append(self._corrida_sobre(self.cartas[i], i))
+
+    def voltear_tope(self):
+        """Da vuelta la carta del tope de la pila.
+        Levanta SolitarioError si la pila está vacía."""
+        codigo = self.codigo_tope() ^ BOCA_ABAJO
+        self.cartas[-1] = codigo
+        self.corridas[-1] = self._corrida_sobre(codigo, len(self.cartas) - 1)
+        self.version += 1
+        if self.historial is not None:
+            self.historial.registrar(VOLTEADA, self)
+
+    def corrida(self):
+        """Devuelve la cantidad de cartas del tope que pueden moverse en
+        bloque según criterio_mover (0 si el tope está boca abajo)."""
+        return self.corridas[-1] if self.corridas else 0
+
+    def _corrida_sobre(self, codigo, posicion=None):
+        """Devuelve el largo de la secuencia movible que terminaría en la
+        carta de ese codigo si se la apila en posicion (por omisión, sobre el
+        tope actual)."""
+        if codigo & BOCA_ABAJO:
+            return 0
+        if posicion is None:
+            posicion = len(self.cartas)
+        if not posicion or not self.corridas[posicion - 1] or self._mover is None:
+            return 1
+        if self._mover(codigo, self.cartas[posicion - 1]):
+            return self.corridas[posicion - 1] + 1
+        return 1
+
+    def puede_apilar(self, carta):
+        """Indica si la carta puede apilarse sobre la pila según valor_inicial
+        y criterio_apilar. No modifica la pila ni levanta excepciones."""
+        if carta.__class__ is not int:
+            carta = carta.codigo
+        cartas = self.cartas
+        if not cartas:
+            return self.valor_inicial is None or carta & BITS_VALOR == self.valor_inicial
+        return self._apilar is None or self._apilar(cartas[-1], carta)
+
+    def error_apilar(self, carta):
+        """Devuelve el mensaje de error que levantaría apilar(carta), o None si
+        la carta puede apilarse."""
+        if self.puede_apilar(carta):
+            return None
+        if self.es_vacia():
+            return "No es posible apilar la carta. No coinciden los valores."
+        return "No es posible apilar la carta. No cumple el criterio para apilar."
+
+    def es_desapilable(self):
+        """Indica si puede desapilarse una carta de la pila. No modifica la
+        pila ni levanta excepciones."""
+        return self.puede_desapilar and bool(self.cartas)
+
+    def puede_mover(self, origen):
+        """Indica si mover(origen) movería alguna carta. No modifica las pilas
+        ni levanta excepciones."""
+        return self.cantidad_a_mover(origen) > 0
+
+    def codigos(self):
+        """Devuelve la lista de códigos de las cartas de la pila, de base a tope."""
+        return self.cartas.tolist()
+
+    def vista(self):
+        """Devuelve los códigos de las cartas de la pila (de base a tope) como
+        bytes: una copia de sólo lectura que sirve para dibujar la pila o como
+        clave de un diccionario."""
+        return self.cartas.tobytes()
+
+    def reemplazar(self, cartas):
+        """Reemplaza todas las cartas de la pila por cartas (de base a tope),
+        sin ningún chequeo. Las cartas pueden ser Cartas o códigos enteros."""
+        codigos = [carta if carta.__class__ is int else carta.codigo for carta in cartas]
+        if self.historial is not None:
+            self.historial.registrar(REEMPLAZADA, self, self.codigos(), codigos)
+        self.cartas = array.array('B')
+        self.corridas = array.array('B')
+        self._extender(codigos)
+        self.version += 1
 
     def mover(self, origen):
         """Siendo origen otra PilaCartas intenta mover un subpilón de cartas
@@ -81,38 +250,66 @@ class PilaCartas:
         cualquier valor.
         Debe levantarse SolitarioError en caso de no poder mover ninguna carta
         de origen a la pila."""
-        aux = PilaCartas()
-        se_hicieron_movimientos = False
-        while not origen.es_vacia() and not origen.tope().boca_abajo:
-            # Recorre la pila de cartas boca arriba
-            try:
-                # Intenta apilarlas en el destino, en caso de ser posible sale de bucle
-                self.apilar(origen.tope())
-                origen.desapilar()
-                while not aux.es_vacia():
-                    self.apilar(aux.desapilar())
-                se_hicieron_movimientos = True
-                break
-            except SolitarioError:
-                # Si no es posible se guarda la variable en un auxiliar
-                aux.apilar(origen.desapilar())
-                # Compara con el criterio de mover en caso falso no sigue buscando coincidencias
-                if not self.criterio_mover(aux.tope(), origen.tope()):
-                    break
-        while not aux.es_vacia():
-            origen.apilar(aux.desapilar(), forzar = True)
-        if not se_hicieron_movimientos:
-            raise SolitarioError("No se puede mover ninguna carta.")
-
-    def mezclar(self):
-        '''Toma una pila de cartas y las mezcla'''
-        lista = []
-        while not self.es_vacia():
-            elemento = self.cartas.desapilar()
-            lista.append(elemento)
-        random.shuffle(lista)
-        while lista != []:
-            self.apilar(lista.pop())
+        cantidad = self.cantidad_a_mover(origen)
+        if not cantidad:
+            raise SolitarioError(self.error_mover(origen))
+        self._recibir(origen, cantidad)
+
+    def error_mover(self, origen):
+        """Devuelve el mensaje de error que levantaría mover(origen), o None si
+        puede moverse alguna carta."""
+        if self.puede_mover(origen):
+            return None
+        return "No se puede mover ninguna carta."
+
+    def cantidad_a_mover(self, origen):
+        """Devuelve cuántas cartas de origen se moverían sobre la pila con
+        mover(), o 0 si no puede moverse ninguna. Se prueba desde el tope
+        hacia abajo dentro de la secuencia movible de origen y se elige la
+        primera carta que pueda apilarse."""
+        if not origen.puede_desapilar or not origen.corridas:
+            return 0
+        cartas = origen.cartas
+        corrida = origen.corridas[-1]
+        destino = self.cartas
+        if destino and self._apilar is not None:
+            tope = destino[-1]
+            comp = self._apilar
+            for i in range(1, corrida + 1):
+                if comp(tope, cartas[-i]):
+                    return i
+            return 0
+        if not destino and self.valor_inicial is not None:
+            for i in range(1, corrida + 1):
+                if cartas[-i] & BITS_VALOR == self.valor_inicial:
+                    return i
+            return 0
+        # Sin restricciones: se mueve sólo la carta del tope, si está boca arriba.
+        return 1 if corrida else 0
+
+    def _recibir(self, origen, cantidad):
+        """Pasa en bloque las cantidad cartas del tope de origen a la pila,
+        sin ningún chequeo."""
+        base = len(origen.cartas) - cantidad
+        bloque = origen.cartas[base:]
+        del origen.cartas[base:]
+        del origen.corridas[base:]
+        self._extender(bloque)
+        origen.version += 1
+        self.version += 1
+        if self.historial is not None:
+            self.historial.registrar(RECIBIDAS, self, origen, cantidad)
+
+    def mezclar(self, azar=random):
+        '''Toma una pila de cartas y las mezcla. azar es el generador a usar
+        (el módulo random o un repartos.Azar)'''
+        # Se mezclan las cartas desde el tope, como si se las desapilara una
+        # a una, y se vuelven a apilar en el orden inverso.
+        lista = self.cartas.tolist()
+        lista.reverse()
+        azar.shuffle(lista)
+        lista.reverse()
+        self.reemplazar(lista)
 
 
     def __str__(self):
@@ -121,20 +318,13 @@ class PilaCartas:
         Si pila_visible == True se representará a la pila como todas las
         cartas de base a tope separadas por espacios. Si no sólo se
         representará según el tope."""
-        if self.es_vacia():
+        if not self.cartas:
             return "X"
-        aux = PilaCartas()
-        resultado = ""
+        tabla = glifos()
         if self.pila_visible:
-            while not self.es_vacia():
-                aux.apilar(self.desapilar())
-            while not aux.es_vacia():
-                elemento = aux.desapilar()
-                resultado += str(elemento) + " "
-                self.apilar(elemento, forzar = True)
-            return resultado
+            return ' '.join([tabla[codigo] for codigo in self.cartas]) + ' '
         else:
-            return str(self.tope())
+            return tabla[self.cartas[-1]]
 
     
     def __repr__(self):
@@ -143,4 +333,13 @@ class PilaCartas:
 
     def __len__(self):
         """Devuelve la cantidad de cartas de la pila"""
-        return len(self.cartas)
\ No newline at end of file
+        return len(self.cartas)
+
+
+def _con_codigos(criterio):
+    """Devuelve una función de criterio que acepta códigos de carta: el mismo
+    criterio si es de criterio() (ya los acepta) o None, y si no uno que lo
+    llama con Cartas."""
+    if criterio is None or hasattr(criterio, 'tabla'):
+        return criterio
+    return lambda a, b: criterio(Carta.desde_codigo(a), Carta.desde_codigo(b))
@@ -0,0 +1,62 @@
+import importlib
+
+GRUPO_ENTRY_POINTS = 'solitario.variantes'
+
+
+class Registro:
+    """Diccionario de solitarios por nombre que importa el módulo de cada
+    uno recién cuando se lo pide. registro[nombre] devuelve el par (Clase,
+    parámetros constructor), igual que un dict común.
+
+    Además de los solitarios propios se agregan los que instalen otros
+    paquetes como entry points del grupo GRUPO_ENTRY_POINTS, de la forma
+    nombre = "modulo:Clase". Se buscan recién cuando se recorre el registro o
+    se pide un nombre que no es propio."""
+
+    def __init__(self, solitarios, grupo=GRUPO_ENTRY_POINTS):
+        """solitarios: dict de "Nombre" a (módulo, clase, parámetros
+        constructor), con el módulo y la clase como strings."""
+        self._pendientes = dict(solitarios)
+        self._cargados = {}
+        self._grupo = grupo
+        self._externos = None
+
+    def __getitem__(self, nombre):
+        if nombre not in self._cargados:
+            if nombre in self._pendientes:
+                modulo, clase, parametros = self._pendientes[nombre]
+                constructor = getattr(importlib.import_module(modulo), clase)
+            elif nombre in self._entry_points():
+                constructor, parametros = self._entry_points()[nombre].load(), None
+            else:
+                raise KeyError(nombre)
+            self._cargados[nombre] = (constructor, parametros)
+        return self._cargados[nombre]
+
+    def __contains__(self, nombre):
+        return nombre in self._pendientes or nombre in self._entry_points()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        """Devuelve los nombres de todos los solitarios, sin importarlos."""
+        return list(self._pendientes) + [nombre for nombre in self._entry_points() if nombre not in self._pendientes]
+
+    def _entry_points(self):
+        """Devuelve (buscándolos la primera vez) los entry points de otros
+        paquetes, por nombre."""
+        if self._externos is None:
+            self._externos = {}
+            try:
+                from importlib.metadata import entry_points
+                encontrados = entry_points(group=self._grupo)
+            except (ImportError, TypeError):
+                # Python < 3.10 no filtra por grupo, no hay variantes externas.
+                encontrados = []
+            for entry_point in encontrados:
+                self._externos[entry_point.name] = entry_point
+        return self._externos
@@ -0,0 +1,98 @@
+# NumPy sólo se usa para generar repartos en lote: se importa con el primer
+# lote (ver _numpy) y no al iniciar el juego.
+np = None
+
+# Repartos numerados: cada número de reparto tiene su propio generador
+# SplitMix64 (el valor k del reparto n es mezclar(base(n) + (k + 1) * GAMMA)),
+# así que se puede ir directo a cualquier reparto, o a cualquier posición de
+# su secuencia, sin generar las anteriores. Sólo usa aritmética entera de 64
+# bits, así que da lo mismo en cualquier versión de Python (y con NumPy).
+GAMMA = 0x9E3779B97F4A7C15
+MASCARA_64 = (1 << 64) - 1
+
+
+def mezclar64(z):
+    """Función de mezcla de SplitMix64 sobre un entero de 64 bits."""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASCARA_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASCARA_64
+    return z ^ (z >> 31)
+
+
+class Azar:
+    """Generador de números aleatorios de un reparto numerado. Implementa
+    los métodos de random que usan crear_mazo y mezclar (randint, shuffle) y
+    random(), así que se lo puede pasar en lugar del módulo random.
+    Atributos:
+        numero: Número de reparto.
+        contador: Cantidad de valores generados hasta ahora."""
+
+    def __init__(self, numero, contador=0):
+        self.numero = numero
+        self.contador = contador
+        self._base = mezclar64(numero & MASCARA_64)
+
+    def siguiente(self):
+        """Devuelve el siguiente entero de 64 bits de la secuencia."""
+        self.contador += 1
+        return mezclar64((self._base + self.contador * GAMMA) & MASCARA_64)
+
+    def debajo(self, n):
+        """Devuelve un entero entre 0 y n - 1 (n < 2 ** 32), como
+        (32 bits altos * n) >> 32."""
+        return ((self.siguiente() >> 32) * n) >> 32
+
+    def randint(self, a, b):
+        """Devuelve un entero entre a y b inclusive."""
+        return a + self.debajo(b - a + 1)
+
+    def random(self):
+        """Devuelve un float entre 0 y 1 (sin incluir el 1)."""
+        return (self.siguiente() >> 11) / (1 << 53)
+
+    def shuffle(self, lista):
+        """Mezcla la lista en el lugar (Fisher-Yates desde el final, igual que
+        random.shuffle)."""
+        for i in range(len(lista) - 1, 0, -1):
+            j = self.debajo(i + 1)
+            lista[i], lista[j] = lista[j], lista[i]
+
+
+def barajar_lote(numeros, valores, desde=0):
+    """Devuelve un array (len(numeros), len(valores)) con valores mezclados
+    como lo haría Azar(n).shuffle(list(valores)) para cada número de reparto
+    n, después de consumir desde valores de su secuencia. Necesita NumPy."""
+    _numpy()
+    numeros = np.asarray(numeros, dtype=np.uint64)
+    bases = _mezclar64_lote(numeros)
+    lote = np.tile(np.asarray(valores), (len(numeros), 1))
+    filas = np.arange(len(numeros))
+    contador = desde
+    for i in range(len(valores) - 1, 0, -1):
+        contador += 1
+        x = _mezclar64_lote(bases + np.uint64(contador * GAMMA & MASCARA_64))
+        j = (((x >> np.uint64(32)) * np.uint64(i + 1)) >> np.uint64(32)).astype(np.intp)
+        columna = lote[:, i].copy()
+        lote[:, i] = lote[filas, j]
+        lote[filas, j] = columna
+    return lote
+
+
+def _numpy():
+    """Importa NumPy en np la primera vez. Levanta ImportError si no está."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("barajar_lote necesita NumPy (pip install numpy)")
+        np = numpy
+    return np
+
+
+def _mezclar64_lote(z):
+    """mezclar64() sobre un array de uint64 (las multiplicaciones dan la
+    vuelta módulo 2 ** 64)."""
+    with np.errstate(over='ignore'):
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
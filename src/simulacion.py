@@ -0,0 +1,123 @@
+from main import SOLITARIOS
+from mesa import *
+from repartos import Azar
+import argparse, contextlib, io, json, os, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+POLITICAS = ('aleatoria', 'codiciosa', 'solver')
+MAX_JUGADAS = 2000
+TAMANIO_BLOQUE = 64
+
+
+def jugar_partida(juego, semilla, politica='aleatoria', max_jugadas=MAX_JUGADAS, numerada=False):
+    """Juega sin interacción el reparto de la semilla (armado como en main)
+    con la política indicada. Si numerada es True se juega el reparto
+    numerado semilla (como main -reparto). Devuelve un dict con el resultado,
+    que depende sólo de los parámetros."""
+    random.seed(semilla)
+    mesa = Mesa()
+    constructor, parametros = SOLITARIOS[juego]
+    solitario = constructor(mesa, *parametros) if parametros else constructor(mesa)
+    if numerada:
+        solitario.azar = Azar(semilla)
+    # Algunos solitarios informan por pantalla, en la simulación se descarta.
+    with contextlib.redirect_stdout(io.StringIO()):
+        solitario.armar()
+        if politica == 'solver':
+            return _resolver(juego, semilla, mesa)
+
+        azar = random.Random(semilla)
+        elegir = _elegir_codiciosa if politica == 'codiciosa' else _elegir_aleatoria
+        jugadas = 0
+        anterior = None
+        while not solitario.termino() and jugadas < max_jugadas:
+            movimientos = solitario.movimientos()
+            if not movimientos:
+                break
+            anterior = elegir(movimientos, anterior, azar)
+            solitario.jugar(anterior)
+            jugadas += 1
+
+    resultado = {'juego': juego, 'semilla': semilla, 'politica': politica,
+                 'gano': bool(solitario.termino()), 'jugadas': jugadas,
+                 'progreso': list(solitario.progreso())}
+    if numerada:
+        resultado['numerada'] = True
+    return resultado
+
+
+def _elegir_aleatoria(movimientos, anterior, azar):
+    return azar.choice(movimientos)
+
+
+def _elegir_codiciosa(movimientos, anterior, azar):
+    """Prefiere subir cartas a las fundaciones, después mover en el tablero
+    (sin deshacer la jugada anterior) y por último pedir al mazo."""
+    fundacion, tablero, resto = [], [], []
+    for jugada in movimientos:
+        if len(jugada) == 2 and jugada[1][0] == FUNDACION:
+            fundacion.append(jugada)
+        elif len(jugada) == 2 and jugada[0][0] == PILA_TABLERO:
+            if anterior is None or len(anterior) != 2 or jugada != (anterior[1], anterior[0]):
+                tablero.append(jugada)
+        else:
+            resto.append(jugada)
+    return azar.choice(fundacion or tablero or resto or movimientos)
+
+
+def _resolver(juego, semilla, mesa):
+    if juego != 'Spider':
+        raise ValueError("La política solver sólo está disponible para Spider")
+    from solver_spider import resolver
+    resultado = resolver(mesa)
+    return {'juego': juego, 'semilla': semilla, 'politica': 'solver',
+            'gano': resultado.ganable is True, 'resuelto': resultado.ganable is not None,
+            'jugadas': len(resultado.solucion) if resultado.solucion else 0,
+            'nodos': resultado.nodos}
+
+
+def _jugar_bloque(argumentos):
+    """Unidad de trabajo de cada proceso: juega un bloque de semillas."""
+    juego, semillas, politica, max_jugadas, numerada = argumentos
+    return [jugar_partida(juego, s, politica, max_jugadas, numerada) for s in semillas]
+
+
+def simular(juego, desde, hasta, politica='aleatoria', procesos=None, bloque=TAMANIO_BLOQUE, max_jugadas=MAX_JUGADAS, numerada=False):
+    """Juega las semillas (o los repartos numerados, si numerada es True) de
+    desde a hasta (inclusive) repartidas en bloques entre procesos. Es un generador de los resultados de cada partida en orden
+    de semilla, así que la salida no depende de la cantidad de procesos."""
+    semillas = list(range(desde, hasta + 1))
+    bloques = [(juego, semillas[i:i + bloque], politica, max_jugadas, numerada) for i in range(0, len(semillas), bloque)]
+    if procesos == 1:
+        for b in bloques:
+            yield from _jugar_bloque(b)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        for resultados in ejecutor.map(_jugar_bloque, bloques):
+            yield from resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula en lote partidas de solitario sobre un rango de semillas.")
+    parser.add_argument('juego', choices=sorted(SOLITARIOS.keys()))
+    parser.add_argument('desde', type=int)
+    parser.add_argument('hasta', type=int)
+    parser.add_argument('--politica', choices=POLITICAS, default='aleatoria')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count())
+    parser.add_argument('--bloque', type=int, default=TAMANIO_BLOQUE)
+    parser.add_argument('--max-jugadas', type=int, default=MAX_JUGADAS)
+    parser.add_argument('--numerados', action='store_true', help="jugar repartos numerados en lugar de semillas")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    partidas = ganadas = 0
+    for resultado in simular(args.juego, args.desde, args.hasta, args.politica, args.procesos, args.bloque, args.max_jugadas, args.numerados):
+        print(json.dumps(resultado, sort_keys=True))
+        partidas += 1
+        ganadas += resultado['gano']
+    segundos = time.perf_counter() - inicio
+    print("{} partidas, {} ganadas ({:.2%}), {:.1f} partidas/s".format(
+        partidas, ganadas, ganadas / partidas if partidas else 0, partidas / segundos if segundos else 0), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
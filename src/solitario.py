@@ -1,7 +1,7 @@
 from mesa import *
 from mazo import*
 
-class Solitario...:
+class Solitario:
     """Interfaz para implementar un solitario."""
 
     def __init__(self, mesa):
@@ -13,11 +13,32 @@ class Solitario...:
         pass
 
     def termino(self):
-        """Avisa si el juego se terminó."""
+        """Avisa si el juego se terminó.
+            Se llama en cada vuelta del juego y en cada nodo de las búsquedas,
+            así que no debería recorrer la mesa: los solitarios llevan
+            contadores (en sus atributos ESTADO) que actualiza cada jugada."""
+        pass
+
+    def progreso(self):
+        """Devuelve un par de enteros (hecho, total) que mide cuánto se avanzó
+            hacia ganar: el juego terminó cuando hecho == total. Sirve como
+            heurística para las búsquedas y para informar el avance."""
         pass
 
     def jugar(self, jugada):
         """Efectúa una movida.
             La jugada es una lista de pares (PILA, numero). (Ver mesa.)
+            Las jugadas [(DESHACER, 0)] y [(REHACER, 0)] deshacen y rehacen
+            la última jugada usando self.historial (ver historial.Historial).
             Si no puede realizarse la jugada se levanta una excepción SolitarioError *descriptiva*."""
         pass
+
+    def puede_jugar(self, jugada):
+        """Indica si la jugada puede efectuarse, sin efectuarla ni levantar excepciones."""
+        pass
+
+    def movimientos(self):
+        """Devuelve la lista de jugadas legales en el estado actual. Cada jugada
+            es una tupla de pares (PILA, numero) que puede pasarse a jugar().
+            La lista se actualiza en forma incremental (ver movimientos.Movimientos)."""
+        pass
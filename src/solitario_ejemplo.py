@@ -1,5 +1,7 @@
 from mesa import *
 from mazo import *
+from movimientos import *
+from historial import *
 
 class SolitarioEjemplo:
     """
@@ -13,13 +15,25 @@ class SolitarioEjemplo:
         Se puede mover el tope de las pilas del tablero entre distintas pilas.
         El juego se termina cuando se subieron todas las cartas de las pilas del tablero a las fundaciones.
     """
+
+    # Atributos enteros que forman parte del estado del juego (además de la
+    # mesa) y que deben guardarse en las instantáneas.
+    ESTADO = ('cartas_tablero',)
+
     def __init__(self, mesa):
         """Inicializa con una mesa creada."""
         self.mesa = mesa
+        # Cartas que quedan en las pilas del tablero, para que termino() no
+        # tenga que recorrerlas.
+        self.cartas_tablero = 0
+        self._movimientos = None
+        # Generador para mezclar: el módulo random o un repartos.Azar.
+        self.azar = random
+        self.historial = Historial(self)
 
     def armar(self):
         """Arma el tablero a la configuración inicial."""
-        self.mesa.mazo = crear_mazo() # Creamos un mazo.
+        self.mesa.mazo = crear_mazo(azar=self.azar) # Creamos un mazo.
 
         for i in range(4):
             # Creamos 4 fundaciones, una para cada palo, no más restricciones
@@ -35,41 +49,76 @@ class SolitarioEjemplo:
                     pila_visible=True,
                 ))
 
-            for j in range(4 + (1 if i < 4 else 0)):
-                # Barajamos cartas en nuestra pila
-                self.mesa.pilas_tablero[i].apilar(self.mesa.mazo.desapilar())
-            self.mesa.pilas_tablero[i].tope().voltear() # Ponemos boca arriba la última carta.
+            # Barajamos cartas en nuestra pila
+            self.mesa.pilas_tablero[i].apilar_varios(self.mesa.mazo.repartir(4 + (1 if i < 4 else 0)))
+            self.mesa.pilas_tablero[i].voltear_tope() # Ponemos boca arriba la última carta.
+        self.cartas_tablero = sum(len(pila) for pila in self.mesa.pilas_tablero)
 
     def termino(self):
         """Avisa si el juego se terminó."""
-        for pila in self.mesa.pilas_tablero:
-            if not pila.es_vacia():
-                return False
-        return True
+        return self.cartas_tablero == 0
+
+    def progreso(self):
+        """Devuelve el par (cartas en las fundaciones, cartas repartidas)."""
+        total = self.cartas_tablero + sum(len(fundacion) for fundacion in self.mesa.fundaciones)
+        return total - self.cartas_tablero, total
 
     def jugar(self, jugada):
         """Efectúa una movida.
             La jugada es una lista de pares (PILA, numero).
             Si no puede realizarse la jugada se levanta una excepción SolitarioError descriptiva."""
+        accion, error = self._analizar(jugada)
+        if error:
+            raise SolitarioError(error)
+        self.historial.efectuar(accion)
+
+    def puede_jugar(self, jugada):
+        """Indica si la jugada puede efectuarse, sin efectuarla ni levantar excepciones."""
+        return self._analizar(jugada)[1] is None
+
+    def movimientos(self):
+        """Devuelve la lista de jugadas legales en el estado actual. Cada jugada
+        es una tupla de pares (PILA, numero) que puede pasarse a jugar()."""
+        if self._movimientos is None:
+            tablero = [(PILA_TABLERO, i) for i in range(len(self.mesa.pilas_tablero))]
+            fundaciones = [(FUNDACION, i) for i in range(len(self.mesa.fundaciones))]
+            candidatas = [(o, d) for o in tablero for d in fundaciones + tablero if o != d]
+            # Ninguna jugada depende de ESTADO, que sólo lleva contadores.
+            self._movimientos = Movimientos(self, self.mesa, candidatas, de_estado=())
+        return self._movimientos.jugadas()
+
+    def _analizar(self, jugada):
+        """Devuelve un par (accion, error). Si la jugada puede efectuarse accion
+        es una tupla (función, argumentos...) que la efectúa y error es None. Si
+        no, error es el mensaje que la describe."""
         j0, p0 = jugada[0]
         j1, p1 = jugada[1] if len(jugada) == 2 else (SALIR, 0)
 
+        if len(jugada) == 1 and j0 in (DESHACER, REHACER):
+            return self.historial.analizar(j0)
+
         if len(jugada) == 1 and j0 == PILA_TABLERO:
-            # Sólo especificaron una pila de origen, intentamos mover a alguna fundación.
-            for fundacion in self.mesa.fundaciones:
-                try:
-                    self._carta_a_pila(self.mesa.pilas_tablero[p0], fundacion)
-                    return
-                except SolitarioError:
-                    pass
-            raise SolitarioError("No puede moverse esa carta a la fundación")
+            # Sólo especificaron una pila de origen, la mesa sabe a qué fundación puede ir.
+            origen = self.mesa.pilas_tablero[p0]
+            f = None if origen.es_vacia() else self.mesa.fundacion_para(origen.codigo_tope())
+            if f is None:
+                return None, "No puede moverse esa carta a la fundación"
+            return (self._carta_a_pila, origen, self.mesa.fundaciones[f]), None
         elif len(jugada) == 2 and j0 == PILA_TABLERO and j1 in (FUNDACION, PILA_TABLERO):
             # Especificaron origen y destino, intentamos mover del tablero adonde corresponda.
             destino = self.mesa.fundaciones[p1] if j1 == FUNDACION else self.mesa.pilas_tablero[p1]
-            self._carta_a_pila(self.mesa.pilas_tablero[p0], destino)
+            error = self._error_carta_a_pila(self.mesa.pilas_tablero[p0], destino)
+            return (self._carta_a_pila, self.mesa.pilas_tablero[p0], destino), error
         else:
             # No hay más jugadas válidas según nuestras reglas.
-            raise SolitarioError("Movimiento inválido")
+            return None, "Movimiento inválido"
+
+    def _error_carta_a_pila(self, origen, pila):
+        """Devuelve el motivo por el que no puede moverse la carta del tope de
+        origen a pila, o None si puede moverse."""
+        if origen.es_vacia():
+            return "La pila está vacía"
+        return pila.error_apilar(origen.codigo_tope())
 
     def _carta_a_pila(self, origen, pila):
         """Mueve la carta del tope entre dos pilas, si se puede, levanta SolitarioError si no."""
@@ -77,8 +126,10 @@ class SolitarioEjemplo:
             raise SolitarioError("La pila está vacía")
 
         # Dejamos que PilaCarta haga las validaciones :)
-        pila.apilar(origen.tope())
+        pila.apilar(origen.codigo_tope())
         origen.desapilar()
+        if pila in self.mesa.fundaciones:
+            self.cartas_tablero -= 1
 
         if not origen.es_vacia() and origen.tope().boca_abajo:
-            origen.tope().voltear()
+            origen.voltear_tope()
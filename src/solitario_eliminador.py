@@ -1,5 +1,7 @@
 from mesa import *
 from mazo import*
+from movimientos import *
+from historial import *
 FUNDACIONES = 6
 PILAS = 4
 class SolitarioEliminador:
@@ -22,13 +24,24 @@ class SolitarioEliminador:
         El juego termina cuando se eliminan todas las cartas de las pilas.
     """
 
+    # Atributos enteros que forman parte del estado del juego (además de la
+    # mesa) y que deben guardarse en las instantáneas.
+    ESTADO = ('cartas_tablero',)
+
     def __init__(self, mesa):
         """Inicializa con una mesa creada y vacía."""
         self.mesa = mesa
+        # Cartas que quedan en las pilas del tablero, para que termino() no
+        # tenga que recorrerlas.
+        self.cartas_tablero = 0
+        self._movimientos = None
+        # Generador para mezclar: el módulo random o un repartos.Azar.
+        self.azar = random
+        self.historial = Historial(self)
 
     def armar(self):
         """Arma el tablero con la configuración inicial."""
-        self.mesa.mazo = crear_mazo() #Se crea el mazo
+        self.mesa.mazo = crear_mazo(azar=self.azar) #Se crea el mazo
         
         # Se crean las fundaciones
 
@@ -45,54 +58,88 @@ class SolitarioEliminador:
                     PilaCartas(pila_visible=True),
                     )
         
-        j = 0    
-        while not self.mesa.mazo.es_vacia():
-            # Se barajan las cartas en las pilas dadas vueltas
-            carta = self.mesa.mazo.desapilar()
+        # Se barajan las cartas en las pilas dadas vueltas: la carta j del
+        # mazo (desde el tope) va a la pila j % PILAS.
+        cartas = self.mesa.mazo.repartir()
+        for carta in cartas:
             carta.voltear()
-            self.mesa.pilas_tablero[j % 4].apilar(carta)
-            j += 1
+        for x, pila in enumerate(self.mesa.pilas_tablero):
+            pila.apilar_varios(cartas[x::PILAS])
+        self.cartas_tablero = len(cartas)
 
     
     def termino(self):
         """Avisa si el juego se terminó."""
-        for pila in self.mesa.pilas_tablero:
-            if not pila.es_vacia():
-                return False
-        return True
+        return self.cartas_tablero == 0
+
+    def progreso(self):
+        """Devuelve el par (cartas eliminadas, cartas repartidas)."""
+        total = self.cartas_tablero + sum(len(fundacion) for fundacion in self.mesa.fundaciones)
+        return total - self.cartas_tablero, total
 
     def jugar(self, jugada):
         """Efectúa una movida.
         La jugada es una lista de pares (PILA, numero).
         Si no puede realizarse la jugada se levanta una excepción SolitarioError descriptiva."""
+        accion, error = self._analizar(jugada)
+        if error:
+            raise SolitarioError(error)
+        self.historial.efectuar(accion)
+
+    def puede_jugar(self, jugada):
+        """Indica si la jugada puede efectuarse, sin efectuarla ni levantar excepciones."""
+        return self._analizar(jugada)[1] is None
+
+    def movimientos(self):
+        """Devuelve la lista de jugadas legales en el estado actual. Cada jugada
+        es una tupla de pares (PILA, numero) que puede pasarse a jugar()."""
+        if self._movimientos is None:
+            candidatas = [((PILA_TABLERO, p), (FUNDACION, f)) for p in range(PILAS) for f in range(FUNDACIONES)]
+            # Ninguna jugada depende de ESTADO, que sólo lleva contadores.
+            self._movimientos = Movimientos(self, self.mesa, candidatas, de_estado=())
+        return self._movimientos.jugadas()
+
+    def _analizar(self, jugada):
+        """Devuelve un par (accion, error). Si la jugada puede efectuarse accion
+        es una tupla (función, argumentos...) que la efectúa y error es None. Si
+        no, error es el mensaje que la describe."""
         j0,p0 = jugada[0]
         j1,p1 = jugada[1] if len(jugada) == 2 else (SALIR, 0)
 
+        if len(jugada) == 1 and j0 in (DESHACER, REHACER):
+            return self.historial.analizar(j0)
+
         if len(jugada) == 1 and j0 == PILA_TABLERO:
             # En el caso que solo se elegir una pila del tablero, trata de ubicar la carta del tope en una fundición si es posible
-            for fundacion in self.mesa.fundaciones:
-                try:
-                    self.mover_carta(self.mesa.pilas_tablero[p0],fundacion)
-                    return
-                except SolitarioError:
-                    pass
-            raise SolitarioError('No puede moverse la carta a la fundacion indicada')
+            origen = self.mesa.pilas_tablero[p0]
+            f = None if origen.es_vacia() else self.mesa.fundacion_para(origen.codigo_tope())
+            if f is None:
+                return None, 'No puede moverse la carta a la fundacion indicada'
+            return (self.mover_carta, origen, self.mesa.fundaciones[f]), None
         if len(jugada) == 2 and j0 == PILA_TABLERO and j1 == FUNDACION:
             # Especificaron origen y destino, intentamos mover del tablero adonde corresponda.
-            self.mover_carta(self.mesa.pilas_tablero[p0],self.mesa.fundaciones[p1])
+            error = self._error_mover_carta(self.mesa.pilas_tablero[p0],self.mesa.fundaciones[p1])
+            return (self.mover_carta, self.mesa.pilas_tablero[p0], self.mesa.fundaciones[p1]), error
 
         else:
             # No hay más jugadas válidas según nuestras reglas.
-            raise SolitarioError("Movimiento inválido")
+            return None, "Movimiento inválido"
+
+    def _error_mover_carta(self,origen,destino):
+        '''Devuelve el motivo por el que no puede moverse la carta del tope de
+        origen a destino, o None si puede moverse'''
+        if origen.es_vacia():
+            return 'La pila esta vacia'
+        return destino.error_apilar(origen.codigo_tope())
 
-            
     def mover_carta(self,origen,destino):
         '''Mueve las cartas desde una pila a una fundación'''
         if origen.es_vacia():
                 raise SolitarioError('La pila esta vacia')
 
-        destino.apilar(origen.tope())
+        destino.apilar(origen.codigo_tope())
         origen.desapilar()
+        self.cartas_tablero -= 1
 
 
 
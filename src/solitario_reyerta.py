@@ -1,5 +1,7 @@
 from mesa import *
 from mazo import *
+from movimientos import *
+from historial import *
 
 CANTIDAD_RECORRIDOS_MAXIMOS = 3
 
@@ -28,14 +30,25 @@ class SolitarioReyerta:
 
 	Implementación: Si se indica como origen una pila y no hay indicado un destino, el juego intentará apilar esa carta en una de las fundaciones.'''
 
+	# Atributos enteros que forman parte del estado del juego (además de la
+	# mesa) y que deben guardarse en las instantáneas.
+	ESTADO = ('recorridos_mazo', 'cartas_fundaciones')
+
 	def __init__(self, mesa):
 		"""Inicializa con una mesa creada."""
 		self.mesa = mesa
 		self.recorridos_mazo = 1
+		# Cartas apiladas en las fundaciones, para que termino() no tenga que
+		# recorrerlas.
+		self.cartas_fundaciones = 0
+		self._movimientos = None
+		# Generador para mezclar: el módulo random o un repartos.Azar.
+		self.azar = random
+		self.historial = Historial(self)
 
 	def armar(self):
 		"""Arma el tablero a la configuración inicial."""
-		self.mesa.mazo = crear_mazo() # Creamos un mazo.
+		self.mesa.mazo = crear_mazo(azar=self.azar) # Creamos un mazo.
 
 		for i in range(4):
 			# Creamos 4 fundaciones vacias
@@ -48,28 +61,27 @@ class SolitarioReyerta:
 								PilaCartas()
 								)
 		# Ponemos los 4 aces en las fundaciones
-		aux = Pila()
+		cartas = self.mesa.mazo.repartir()
 		i = 0
-		while not self.mesa.mazo.es_vacia():
-			carta = self.mesa.mazo.desapilar()
+		for carta in cartas:
 			if carta.valor == 1:
 				carta.voltear()
 				self.mesa.fundaciones[i].apilar(carta)
 				i += 1
-			else:
-				aux.apilar(carta)
-		while not aux.esta_vacia():
-			self.mesa.mazo.apilar(aux.desapilar())
+		self.cartas_fundaciones = i
+		# El resto vuelve al mazo en el mismo orden
+		self.mesa.mazo.apilar_varios([carta for carta in reversed(cartas) if carta.valor != 1])
 
 		# Ponemos una carta en cada pila del tablero
 		self._colocar_carta_pilas_tablero()
 
 	def termino(self):
 		"""Avisa cuando se termina el juego"""
-		for fundacion in self.mesa.fundaciones:
-			if len(fundacion) < 13:
-				return False
-		return True
+		return self.cartas_fundaciones == 13 * len(self.mesa.fundaciones)
+
+	def progreso(self):
+		"""Devuelve el par (cartas en las fundaciones, cartas del mazo)."""
+		return self.cartas_fundaciones, 13 * len(self.mesa.fundaciones)
 
 
 
@@ -77,44 +89,77 @@ class SolitarioReyerta:
 		"""Efectúa una movida.
 		La jugada es una lista de pares (PILA, numero).
 		Si no puede realizarse la jugada se levanta una excepción SolitarioError descriptiva."""
+		accion, error = self._analizar(jugada)
+		if error:
+			raise SolitarioError(error)
+		self.historial.efectuar(accion)
+
+	def puede_jugar(self, jugada):
+		"""Indica si la jugada puede efectuarse, sin efectuarla ni levantar excepciones."""
+		return self._analizar(jugada)[1] is None
+
+	def movimientos(self):
+		"""Devuelve la lista de jugadas legales en el estado actual. Cada jugada
+		es una tupla de pares (PILA, numero) que puede pasarse a jugar()."""
+		if self._movimientos is None:
+			candidatas = [((MAZO, 0),)]
+			candidatas += [((PILA_TABLERO, p), (FUNDACION, f)) for p in range(4) for f in range(4)]
+			# Pedir el mazo acabado depende de recorridos_mazo.
+			self._movimientos = Movimientos(self, self.mesa, candidatas, de_estado=candidatas[:1])
+		return self._movimientos.jugadas()
+
+	def _analizar(self, jugada):
+		"""Devuelve un par (accion, error). Si la jugada puede efectuarse accion
+		es una tupla (función, argumentos...) que la efectúa y error es None. Si
+		no, error es el mensaje que la describe."""
 		j0, p0 = jugada[0]
 		j1, p1 = jugada[1] if len(jugada) == 2 else (SALIR, 0)
 
+		if len(jugada) == 1 and j0 in (DESHACER, REHACER):
+			return self.historial.analizar(j0)
+
 		if len(jugada) == 1 and j0 == PILA_TABLERO:
-		# Sólo especificaron una pila de origen, intentamos mover a alguna fundación.
-			for fundacion in self.mesa.fundaciones:
-				try:
-					self._carta_a_pila(self.mesa.pilas_tablero[p0], fundacion)
-					return
-				except SolitarioError:
-					pass
-			raise SolitarioError("No puede moverse esa carta a la fundación")
+		# Sólo especificaron una pila de origen, la mesa sabe a qué fundación puede ir.
+			origen = self.mesa.pilas_tablero[p0]
+			f = None if origen.es_vacia() else self.mesa.fundacion_para(origen.codigo_tope())
+			if f is None:
+				return None, "No puede moverse esa carta a la fundación"
+			return (self._carta_a_pila, origen, self.mesa.fundaciones[f]), None
 
 		elif len(jugada) == 1 and j0 == MAZO:
 		# Pidio cartas al mazo. Se reparte una carta a cada pila del tablero.
 			if self.mesa.mazo.es_vacia():
 			#En el caso que no tenga cartas para repartir devuelven todas las cartas de las pilas al mazo, se mezcla y se vuelven a repartir
 				if self.recorridos_mazo == CANTIDAD_RECORRIDOS_MAXIMOS:
-					raise SolitarioError(f"Ya se recorrió el mazo el máximo de veces {CANTIDAD_RECORRIDOS_MAXIMOS}")
-				for pila_tablero in self.mesa.pilas_tablero:
-					while not pila_tablero.es_vacia():
-						carta = pila_tablero.desapilar()
-						carta.voltear()
-						self.mesa.mazo.apilar(carta)
-				print("Barajando mazo, recorridos restantes {}".format(CANTIDAD_RECORRIDOS_MAXIMOS - self.recorridos_mazo))
-				self.mesa.mazo.mezclar()
-				self.recorridos_mazo += 1
-				self._colocar_carta_pilas_tablero()
-			else:
-				self._colocar_carta_pilas_tablero()
-
+					return None, f"Ya se recorrió el mazo el máximo de veces {CANTIDAD_RECORRIDOS_MAXIMOS}"
+				return (self._rebarajar,), None
+			return (self._colocar_carta_pilas_tablero,), None
 
 		elif len(jugada) == 2 and j0 == PILA_TABLERO and j1 == FUNDACION:
 		# Especificaron tabla y fundacion donde colocar
-			self._carta_a_pila(self.mesa.pilas_tablero[p0], self.mesa.fundaciones[p1])
+			error = self._error_carta_a_pila(self.mesa.pilas_tablero[p0], self.mesa.fundaciones[p1])
+			return (self._carta_a_pila, self.mesa.pilas_tablero[p0], self.mesa.fundaciones[p1]), error
 		else:
 		# No hay más jugadas válidas según nuestras reglas.
-			raise SolitarioError("Movimiento inválido")
+			return None, "Movimiento inválido"
+
+	def _rebarajar(self):
+		"""Devuelve todas las cartas de las pilas al mazo, lo mezcla y vuelve a repartir"""
+		for pila_tablero in self.mesa.pilas_tablero:
+			while not pila_tablero.es_vacia():
+				carta = pila_tablero.desapilar()
+				carta.voltear()
+				self.mesa.mazo.apilar(carta)
+		print("Barajando mazo, recorridos restantes {}".format(CANTIDAD_RECORRIDOS_MAXIMOS - self.recorridos_mazo))
+		self.mesa.mazo.mezclar(self.azar)
+		self.recorridos_mazo += 1
+		self._colocar_carta_pilas_tablero()
+
+	def _error_carta_a_pila(self, origen, pila):
+		"""Devuelve el motivo por el que no puede moverse la carta del tope de origen a pila, o None si puede moverse."""
+		if origen.es_vacia():
+			return "La pila está vacía"
+		return pila.error_apilar(origen.codigo_tope())
 
 	def _carta_a_pila(self, origen, pila):
 		"""Mueve la carta del tope entre dos pilas, si se puede, levanta SolitarioError si no."""
@@ -122,15 +167,16 @@ class SolitarioReyerta:
 			raise SolitarioError("La pila está vacía")
 
 		# Dejamos que PilaCarta haga las validaciones
-		pila.apilar(origen.tope())
+		pila.apilar(origen.codigo_tope())
 		origen.desapilar()
+		self.cartas_fundaciones += 1
 
 		if not origen.es_vacia() and origen.tope().boca_abajo:
-			origen.tope().voltear()
+			origen.voltear_tope()
 
 	def _colocar_carta_pilas_tablero(self):
 		"""Seteamos las pilas con una carta del mazo boca arriba"""
 		for i in range(4):
 			if not self.mesa.mazo.es_vacia():
 				self.mesa.pilas_tablero[i].apilar(self.mesa.mazo.desapilar())
-				self.mesa.pilas_tablero[i].tope().voltear()
+				self.mesa.pilas_tablero[i].voltear_tope()
@@ -1,5 +1,7 @@
 from mesa import *
 from mazo import*
+from movimientos import *
+from historial import *
 
 PILAS_6=[1,4,7,10]
 
@@ -32,14 +34,25 @@ class SolitarioSpider:
 
     Implementación: Si se indica como origen una pila y no hay indicado un destino, el juego intentará apilar el pilón superior de la pila en una de las fundaciones."""
 
+    # Atributos enteros que forman parte del estado del juego (además de la
+    # mesa) y que deben guardarse en las instantáneas.
+    ESTADO = ('fundaciones_completas',)
+
     def __init__(self, mesa):
         """Inicializa con una mesa creada y vacía."""
         self.mesa = mesa
+        # Fundaciones con su secuencia de la K a la A, para que termino() no
+        # tenga que recorrerlas.
+        self.fundaciones_completas = 0
+        self._movimientos = None
+        # Generador para mezclar: el módulo random o un repartos.Azar.
+        self.azar = random
+        self.historial = Historial(self)
 
     def armar(self):
         """Arma el tablero con la configuración inicial."""
         #Se crean los mazos
-        self.mesa.mazo = crear_mazo(mazos=2,palos=1)
+        self.mesa.mazo = crear_mazo(mazos=2,palos=1,azar=self.azar)
        
         #Se crean las 8 fundaciones, de un solo palo
         for x in range(8):
@@ -59,73 +72,113 @@ class SolitarioSpider:
                 criterio_apilar = criterio(orden = DESCENDENTE),
                 criterio_mover = criterio(orden = ASCENDENTE),
                 ))
-            for i in range(5 + (1 if (j + 1) in PILAS_6 else 0)):
-                self.mesa.pilas_tablero[j].apilar(self.mesa.mazo.desapilar(), forzar = True)
-            self.mesa.pilas_tablero[j].tope().voltear()
+            self.mesa.pilas_tablero[j].apilar_varios(self.mesa.mazo.repartir(5 + (1 if (j + 1) in PILAS_6 else 0)))
+            self.mesa.pilas_tablero[j].voltear_tope()
 
 
     def termino(self):
         """Avisa cuando se termina el juego"""
-        for fundacion in self.mesa.fundaciones:
-            if len(fundacion) < 13:
-                return False
-        return True
+        return self.fundaciones_completas == len(self.mesa.fundaciones)
+
+    def progreso(self):
+        """Devuelve el par (fundaciones completas, fundaciones)."""
+        return self.fundaciones_completas, len(self.mesa.fundaciones)
 
     def jugar(self, jugada):
         """Efectúa una movida.
         La jugada es una lista de pares (PILA, numero).
         Si no puede realizarse la jugada se levanta una excepción SolitarioError descriptiva."""
+        accion, error = self._analizar(jugada)
+        if error:
+            raise SolitarioError(error)
+        self.historial.efectuar(accion)
+
+    def puede_jugar(self, jugada):
+        """Indica si la jugada puede efectuarse, sin efectuarla ni levantar excepciones."""
+        return self._analizar(jugada)[1] is None
+
+    def movimientos(self):
+        """Devuelve la lista de jugadas legales en el estado actual. Cada jugada
+        es una tupla de pares (PILA, numero) que puede pasarse a jugar()."""
+        if self._movimientos is None:
+            tablero = [(PILA_TABLERO, i) for i in range(len(self.mesa.pilas_tablero))]
+            fundaciones = [(FUNDACION, i) for i in range(len(self.mesa.fundaciones))]
+            candidatas = [((MAZO, 0),)]
+            candidatas += [(o, d) for o in tablero + fundaciones for d in tablero + fundaciones if o != d]
+            # Ninguna jugada depende de ESTADO, que sólo lleva contadores.
+            self._movimientos = Movimientos(self, self.mesa, candidatas, de_estado=())
+        return self._movimientos.jugadas()
+
+    def _analizar(self, jugada):
+        """Devuelve un par (accion, error). Si la jugada puede efectuarse accion
+        es una tupla (función, argumentos...) que la efectúa y error es None. Si
+        no, error es el mensaje que la describe."""
         j0, p0 = jugada[0]
         j1, p1 = jugada[1] if len(jugada) == 2 else (SALIR, 0)
 
+        if len(jugada) == 1 and j0 in (DESHACER, REHACER):
+            return self.historial.analizar(j0)
+
         if len(jugada) == 1 and j0 == MAZO:
             # Pide cartas al mazo
-            self.repartir_mazo()
+            if not self.mesa.mazo.es_desapilable():
+                return None, "La pila de cartas esta vacia."
+            return (self.repartir_mazo,), None
 
         elif len(jugada) == 1 and j0 == PILA_TABLERO:
             # Trata de ubicar una subpila de la pila en una fundación
             for fundacion in self.mesa.fundaciones:
-                try:
-                    self.mover_pila(self.mesa.pilas_tablero[p0], fundacion)
-                    return
-                except SolitarioError:
-                    pass
-            raise SolitarioError("No hay ninguna fundación a la que se pueda mover la pila.")
+                if self._error_mover_pila(self.mesa.pilas_tablero[p0], fundacion) is None:
+                    return (self.mover_pila, self.mesa.pilas_tablero[p0], fundacion), None
+            return None, "No hay ninguna fundación a la que se pueda mover la pila."
 
         elif len(jugada) == 2 and j0 == PILA_TABLERO and j1 in (FUNDACION,PILA_TABLERO):
             # Mueve una subpila de una pila del tablero a otra pila o fundación, si es posible
             destino = self.mesa.fundaciones[p1] if j1 == FUNDACION else self.mesa.pilas_tablero[p1]
-            self.mover_pila(self.mesa.pilas_tablero[p0], destino)
+            error = self._error_mover_pila(self.mesa.pilas_tablero[p0], destino)
+            return (self.mover_pila, self.mesa.pilas_tablero[p0], destino), error
 
         elif len(jugada) == 2 and j0 == FUNDACION and len(self.mesa.fundaciones[p0]) == 13 and j1 in (FUNDACION,PILA_TABLERO):
             # Mueve toda la fundación como una secuencia completa al destino
             destino = self.mesa.fundaciones[p1] if j1 == FUNDACION else self.mesa.pilas_tablero[p1]
-            self.mover_pila(self.mesa.fundaciones[p0], destino)
+            error = self._error_mover_pila(self.mesa.fundaciones[p0], destino)
+            return (self.mover_pila, self.mesa.fundaciones[p0], destino), error
 
         else:
-            raise SolitarioError("Movimiento Inválido.")
+            return None, "Movimiento Inválido."
 
-            
-    def mover_pila(self,origen,destino):
-        '''Mueve (si es posible) una subpila del origen al destino'''
+    def _error_mover_pila(self,origen,destino):
+        '''Devuelve el motivo por el que no puede moverse una subpila del origen
+        al destino, o None si puede moverse'''
         if origen.es_vacia():
-            raise SolitarioError('La pila esta vacia')
+            return 'La pila esta vacia'
 
-        destino.mover(origen)
+        cantidad = destino.cantidad_a_mover(origen)
+        if not cantidad:
+            return destino.error_mover(origen)
 
-        if destino in self.mesa.fundaciones:
+        if destino in self.mesa.fundaciones and cantidad < 13:
             # En caso de que trate de apilar en una fundación una subpila no completa
-            if len(destino) < 13:
-                origen.mover(destino)
-                raise SolitarioError("Solo se pueden apilar secuencias completas en las fundaciones.")
+            return "Solo se pueden apilar secuencias completas en las fundaciones."
+        return None
+
+    def mover_pila(self,origen,destino):
+        '''Mueve (si es posible) una subpila del origen al destino'''
+        error = self._error_mover_pila(origen, destino)
+        if error:
+            raise SolitarioError(error)
+
+        destino.mover(origen)
+        # Las fundaciones sólo reciben o entregan secuencias completas.
+        self.fundaciones_completas += (destino in self.mesa.fundaciones) - (origen in self.mesa.fundaciones)
 
-        if origen.tope().boca_abajo:
-            origen.tope().voltear()
+        if not origen.es_vacia() and origen.tope().boca_abajo:
+            origen.voltear_tope()
 
 
     def repartir_mazo(self):
         '''Reparte una carta dada vuelta a cada pila desde el mazo'''
         for j in range(10):
             self.mesa.pilas_tablero[j].apilar(self.mesa.mazo.desapilar(), forzar = True)
-            self.mesa.pilas_tablero[j].tope().voltear()
+            self.mesa.pilas_tablero[j].voltear_tope()
 
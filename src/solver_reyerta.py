@@ -0,0 +1,215 @@
+from solitario_reyerta import *
+import argparse, contextlib, io, json, os, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+# En Reyerta los palos no importan: las fundaciones suben de a uno sin mirar
+# el palo y en el tablero no se apila. El análisis trabaja sólo con valores.
+VALOR_MAXIMO = 13
+CANTIDAD_PILAS = 4
+GANADO = (VALOR_MAXIMO,) * CANTIDAD_PILAS
+
+MUESTRAS = 32
+TAMANIO_BLOQUE = 8
+
+# Caché de cada proceso con las probabilidades ya estimadas de las
+# rebarajadas (ver _valor_rebarajada). No depende del reparto, así que sirve
+# para todos los que analice el proceso.
+_CACHE = {}
+
+
+def analizar(mesa, solitario, muestras=MUESTRAS, cache=None):
+    """Estima la probabilidad de ganar el Reyerta de mesa jugando de la mejor
+    manera posible desde la posición actual.
+
+    Dentro de cada pasada por el mazo el orden de las cartas está fijo, así que
+    se busca la mejor forma de jugarla (con tabla de transposición). Al
+    acabarse el mazo las cartas se rebarajan: ahí se promedia sobre muestras
+    mezclas al azar de las cartas que quedan. Como las cartas que quedan son
+    exactamente las que no llegaron a las fundaciones, la probabilidad de una
+    rebarajada depende sólo de los topes de las fundaciones y de las
+    rebarajadas restantes, y se guarda en cache (por omisión, la del proceso)
+    para reusarla en otras ramas y en otros repartos.
+
+    Se supone que el jugador conoce el orden del mazo de la pasada en curso
+    (no el de las mezclas futuras), así que es una cota superior de lo que
+    puede lograr alguien que no ve el mazo."""
+    if cache is None:
+        cache = _CACHE
+    pilas = tuple(_valores(pila) for pila in mesa.pilas_tablero)
+    mazo = tuple(reversed(_valores(mesa.mazo)))
+    topes = tuple(sorted(fundacion.tope().valor for fundacion in mesa.fundaciones))
+    restantes = CANTIDAD_RECORRIDOS_MAXIMOS - solitario.recorridos_mazo
+    return _valor_pasada(pilas, mazo, topes, restantes, muestras, cache)
+
+
+def _valores(pila):
+    return tuple(codigo & BITS_VALOR for codigo in pila.codigos())
+
+
+def _valor_pasada(pilas, mazo, topes, restantes, muestras, cache):
+    """Devuelve la mejor probabilidad de ganar desde pilas (tuplas de valores
+    de base a tope) con el mazo (valores en el orden en que se reparten) y las
+    fundaciones en topes (ordenados)."""
+    memo = {}
+
+    def valor(pilas, repartidas, topes):
+        pilas, topes, en_disputa = _jugar_seguras(pilas, topes)
+        if topes == GANADO:
+            return 1.0
+        clave = (pilas, repartidas, topes)
+        if clave in memo:
+            return memo[clave]
+
+        # Cartas que compiten con otras del mismo valor: se prueba subir cada
+        # una, antes de repartir, porque suelen llevar antes a ganar.
+        mejor = 0.0
+        for p in en_disputa:
+            carta = pilas[p][-1]
+            nuevas = pilas[:p] + (pilas[p][:-1],) + pilas[p + 1:]
+            mejor = max(mejor, valor(nuevas, repartidas, _subir(topes, carta)))
+            if mejor == 1.0:
+                memo[clave] = mejor
+                return mejor
+
+        if repartidas < len(mazo):
+            # Repartir: una carta sobre cada pila, en orden.
+            nuevas = list(pilas)
+            for i, carta in enumerate(mazo[repartidas:repartidas + CANTIDAD_PILAS]):
+                nuevas[i] = nuevas[i] + (carta,)
+            mejor = max(mejor, valor(tuple(nuevas), repartidas + CANTIDAD_PILAS, topes))
+        elif restantes:
+            mejor = max(mejor, _valor_rebarajada(topes, restantes, muestras, cache))
+
+        memo[clave] = mejor
+        return mejor
+
+    return valor(pilas, 0, topes)
+
+
+def _jugar_seguras(pilas, topes):
+    """Sube a las fundaciones los topes de las pilas que siguen a la fundación
+    más baja. Las cartas de ese valor que quedan son tantas como fundaciones
+    con ese tope, y ninguna otra fundación puede bajar a recibirlas: no
+    compiten entre sí, así que subirlas nunca empeora la posición. Las demás
+    sí pueden competir con cartas del mismo valor que todavía no salieron,
+    para fundaciones que aún no llegaron a recibirlas. Devuelve (pilas, topes,
+    en_disputa) con las pilas que quedaron con una carta que podría subirse."""
+    while True:
+        seguras = [p for p, pila in enumerate(pilas) if pila and pila[-1] == topes[0] + 1]
+        if not seguras:
+            return pilas, topes, [p for p, pila in enumerate(pilas) if pila and pila[-1] - 1 in topes]
+        pilas = list(pilas)
+        for p in seguras:
+            topes = _subir(topes, pilas[p][-1])
+            pilas[p] = pilas[p][:-1]
+        pilas = tuple(pilas)
+
+
+def _subir(topes, carta):
+    """Devuelve los topes después de apilar carta sobre una fundación de tope
+    carta - 1."""
+    topes = list(topes)
+    topes[topes.index(carta - 1)] = carta
+    return tuple(sorted(topes))
+
+
+def _valor_rebarajada(topes, restantes, muestras, cache):
+    """Estima la probabilidad de ganar al rebarajar con las fundaciones en
+    topes: se juegan muestras pasadas con las cartas que faltan mezcladas al
+    azar. Las mezclas se sortean con una semilla que sale de (topes,
+    restantes, muestras), así que el resultado no depende de qué se analizó
+    antes ni de qué proceso lo calcula."""
+    clave = (topes, restantes, muestras)
+    if clave not in cache:
+        cartas = [v for v in range(1, VALOR_MAXIMO + 1) for i in range(CANTIDAD_PILAS - sum(t >= v for t in topes))]
+        azar = random.Random(repr(clave))
+        total = 0.0
+        vacias = ((),) * CANTIDAD_PILAS
+        for i in range(muestras):
+            azar.shuffle(cartas)
+            total += _valor_pasada(vacias, tuple(cartas), topes, restantes - 1, muestras, cache)
+        cache[clave] = total / muestras
+    return cache[clave]
+
+
+def analizar_semilla(semilla, muestras=MUESTRAS, cache=None):
+    """Arma el reparto de Reyerta de la semilla (como lo hace main) y devuelve
+    analizar() de su posición inicial."""
+    random.seed(semilla)
+    mesa = Mesa()
+    solitario = SolitarioReyerta(mesa)
+    with contextlib.redirect_stdout(io.StringIO()):
+        solitario.armar()
+    return analizar(mesa, solitario, muestras, cache)
+
+
+def _analizar_bloque(argumentos):
+    """Unidad de trabajo de cada proceso: analiza un bloque de semillas. Antes
+    suma a la caché del proceso las entradas que le pasan y al final devuelve
+    las que calculó, para compartirlas con los demás procesos."""
+    semillas, muestras, conocidas = argumentos
+    _CACHE.update(conocidas)
+    antes = set(_CACHE)
+    resultados = []
+    for semilla in semillas:
+        inicio = time.perf_counter()
+        probabilidad = analizar_semilla(semilla, muestras)
+        resultados.append({'juego': 'Reyerta', 'semilla': semilla, 'muestras': muestras,
+                           'probabilidad': probabilidad, 'segundos': round(time.perf_counter() - inicio, 3)})
+    return resultados, {clave: _CACHE[clave] for clave in _CACHE if clave not in antes}
+
+
+def etiquetar(desde, hasta, muestras=MUESTRAS, procesos=None, bloque=TAMANIO_BLOQUE):
+    """Analiza las semillas de desde a hasta (inclusive) repartidas en bloques
+    entre procesos. Es un generador de los resultados en orden de semilla.
+    Las probabilidades de las rebarajadas que calcula cada proceso se juntan
+    y se mandan con los bloques siguientes, así que los procesos comparten la
+    caché; como cada entrada no depende de quién la calcula, los resultados
+    tampoco dependen de la cantidad de procesos."""
+    semillas = list(range(desde, hasta + 1))
+    bloques = [semillas[i:i + bloque] for i in range(0, len(semillas), bloque)]
+    cache = {}
+    if procesos == 1:
+        for b in bloques:
+            resultados, nuevas = _analizar_bloque((b, muestras, {}))
+            yield from resultados
+        return
+    procesos = procesos or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        pendientes = []
+        for b in bloques:
+            pendientes.append(ejecutor.submit(_analizar_bloque, (b, muestras, dict(cache))))
+            # Se mantienen ocupados todos los procesos, pero no más, para que
+            # los bloques nuevos salgan con la caché actualizada.
+            while len(pendientes) > procesos:
+                resultados, nuevas = pendientes.pop(0).result()
+                cache.update(nuevas)
+                yield from resultados
+        for futuro in pendientes:
+            resultados, nuevas = futuro.result()
+            cache.update(nuevas)
+            yield from resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estima la probabilidad de ganar los repartos de Reyerta de un rango de semillas.")
+    parser.add_argument('desde', type=int)
+    parser.add_argument('hasta', type=int)
+    parser.add_argument('--muestras', type=int, default=MUESTRAS, help="mezclas por rebarajada")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count())
+    parser.add_argument('--bloque', type=int, default=TAMANIO_BLOQUE)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    partidas = 0
+    suma = 0.0
+    for resultado in etiquetar(args.desde, args.hasta, args.muestras, args.procesos, args.bloque):
+        print(json.dumps(resultado, sort_keys=True))
+        partidas += 1
+        suma += resultado['probabilidad']
+    segundos = time.perf_counter() - inicio
+    print("{} repartos, probabilidad media {:.2%}, {:.1f} repartos/s".format(
+        partidas, suma / partidas if partidas else 0, partidas / segundos if segundos else 0), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+from solitario_spider import *
+import heapq, random, sys, time
+
+CANTIDAD_PILAS = 10
+CANTIDAD_FUNDACIONES = 8
+CARTAS_POR_REPARTO = 10
+ALTURA_MAXIMA = 104
+
+MAX_NODOS = 200000
+
+# Claves de Zobrist: una por (pila, posición, código de carta), más una por
+# cantidad de repartos hechos y por cantidad de fundaciones completas. Se
+# generan con una semilla fija para que los hashes sean reproducibles.
+_azar = random.Random(0x5B1DE5)
+_ZOBRIST_CARTAS = [[[_azar.getrandbits(64) for c in range(CANTIDAD_CODIGOS)]
+                    for p in range(ALTURA_MAXIMA)] for i in range(CANTIDAD_PILAS)]
+_ZOBRIST_REPARTOS = [_azar.getrandbits(64) for i in range(ALTURA_MAXIMA // CARTAS_POR_REPARTO + 1)]
+_ZOBRIST_COMPLETAS = [_azar.getrandbits(64) for i in range(CANTIDAD_FUNDACIONES + 1)]
+del _azar
+
+
+class ResultadoSolver:
+    """Resultado de resolver() un reparto de Spider. Atributos:
+        ganable: True si se encontró una solución, False si se recorrieron
+            todos los estados sin encontrarla y None si se cortó la búsqueda
+            por el presupuesto de nodos o de memoria.
+        solucion: Lista de comandos (como los que recibe Mesa.parsear_jugada)
+            que ganan el juego desde el estado inicial, o None.
+        nodos: Cantidad de estados expandidos.
+        nodos_por_segundo: Velocidad de la búsqueda.
+        memoria_pico: Memoria que ocupó esta búsqueda en bytes, estimada (ver
+            _memoria_nodo) para que no dependa de lo que hizo antes el
+            proceso."""
+
+    def __init__(self, ganable, solucion, nodos, segundos, memoria_pico):
+        self.ganable = ganable
+        self.solucion = solucion
+        self.nodos = nodos
+        self.nodos_por_segundo = nodos / segundos if segundos > 0 else 0.0
+        self.memoria_pico = memoria_pico
+
+    def __str__(self):
+        ganable = {True: 'ganable', False: 'no ganable', None: 'sin resolver'}[self.ganable]
+        largo = len(self.solucion) if self.solucion is not None else '-'
+        return '{} jugadas={} nodos={} nodos/s={:.0f} memoria={}'.format(
+            ganable, largo, self.nodos, self.nodos_por_segundo, self.memoria_pico)
+
+
+def resolver(mesa, max_nodos=MAX_NODOS, max_memoria=None):
+    """Busca una solución para la mesa de un SolitarioSpider (2 mazos, un palo)
+    con una búsqueda best-first sobre estados con tabla de transposición por
+    hash de Zobrist.
+        max_nodos: Cantidad máxima de estados a expandir.
+        max_memoria: Memoria máxima de la búsqueda en bytes (None para no
+            limitarla). Se cuenta sólo la de esta búsqueda, así que
+            resolver muchos repartos en un mismo proceso no cambia el
+            resultado de cada uno.
+    Devuelve un ResultadoSolver."""
+    tablero = tuple(tuple(pila.codigos()) for pila in mesa.pilas_tablero)
+    mazo = tuple(mesa.mazo.codigos())
+    completas = sum(1 for fundacion in mesa.fundaciones if len(fundacion) == 13)
+    repartos_totales = len(mazo) // CARTAS_POR_REPARTO
+
+    inicio = time.perf_counter()
+    h = _hash(tablero, 0, completas)
+    # Cada nodo es (tablero, repartos hechos, completas, hash, padre, comando).
+    raiz = (tablero, 0, completas, h, None, None)
+    vistos = {h}
+    frontera = [(_prioridad(tablero, 0, completas), 0, raiz)]
+    contador = 1
+    nodos = 0
+    # Bytes de los nodos creados; la tabla de vistos y la lista de la
+    # frontera se suman aparte porque crecen de a saltos.
+    memoria = 0
+
+    while frontera:
+        pico = memoria + sys.getsizeof(vistos) + sys.getsizeof(frontera)
+        if nodos >= max_nodos or (max_memoria and pico > max_memoria):
+            return ResultadoSolver(None, None, nodos, time.perf_counter() - inicio, pico)
+        nodo = heapq.heappop(frontera)[2]
+        nodos += 1
+        if nodo[2] == CANTIDAD_FUNDACIONES:
+            return ResultadoSolver(True, _camino(nodo), nodos, time.perf_counter() - inicio, pico)
+
+        for hijo in _sucesores(nodo, mazo, repartos_totales):
+            if hijo[3] in vistos:
+                continue
+            vistos.add(hijo[3])
+            heapq.heappush(frontera, (_prioridad(hijo[0], hijo[1], hijo[2]), contador, hijo))
+            contador += 1
+            memoria += _memoria_nodo(hijo, nodo)
+
+    return ResultadoSolver(False, None, nodos, time.perf_counter() - inicio,
+                           memoria + sys.getsizeof(vistos) + sys.getsizeof(frontera))
+
+
+def _sucesores(nodo, mazo, repartos_totales):
+    """Genera los nodos alcanzables con una jugada desde nodo, con las mismas
+    reglas que SolitarioSpider.jugar()."""
+    tablero, repartos, completas, h = nodo[:4]
+    corridas = [_corrida(pila) for pila in tablero]
+
+    # Subir una secuencia completa a la fundación nunca perjudica: si hay una
+    # se juega sólo esa.
+    for o, pila in enumerate(tablero):
+        if corridas[o] == 13:
+            nuevo_h = h ^ _ZOBRIST_COMPLETAS[completas] ^ _ZOBRIST_COMPLETAS[completas + 1]
+            origen, nuevo_h = _quitar(o, pila, 13, nuevo_h)
+            comando = _letra(o) + str(completas + 1)
+            yield (_reemplazar(tablero, {o: origen}), repartos, completas + 1, nuevo_h, nodo, comando)
+            return
+
+    primera_vacia = None
+    for d, pila in enumerate(tablero):
+        if not pila:
+            primera_vacia = d
+            break
+
+    for o, pila in enumerate(tablero):
+        corrida = corridas[o]
+        if not corrida:
+            continue
+        valor_tope = pila[-1] & BITS_VALOR
+        for d, destino in enumerate(tablero):
+            if d == o:
+                continue
+            if not destino:
+                # Sobre una pila vacía sólo se mueve el tope. Todas las pilas
+                # vacías son equivalentes, se prueba sólo la primera; y no
+                # tiene sentido mover la única carta de una pila.
+                if d != primera_vacia or len(pila) == 1:
+                    continue
+                cantidad = 1
+            else:
+                cantidad = (destino[-1] & BITS_VALOR) - valor_tope
+                if destino[-1] & BOCA_ABAJO or cantidad < 1 or cantidad > corrida:
+                    continue
+                if cantidad < corrida:
+                    # Con un solo palo, cortar una secuencia para ponerla
+                    # sobre una carta del mismo valor no cambia nada.
+                    continue
+            bloque = pila[-cantidad:]
+            origen, nuevo_h = _quitar(o, pila, cantidad, h)
+            nuevo_h = _agregar(d, destino, bloque, nuevo_h)
+            tablero_nuevo = _reemplazar(tablero, {o: origen, d: destino + bloque})
+            yield (tablero_nuevo, repartos, completas, nuevo_h, nodo, _letra(o) + _letra(d))
+
+    if repartos < repartos_totales:
+        cambios = {}
+        nuevo_h = h ^ _ZOBRIST_REPARTOS[repartos] ^ _ZOBRIST_REPARTOS[repartos + 1]
+        base = len(mazo) - CARTAS_POR_REPARTO * repartos
+        for j, pila in enumerate(tablero):
+            carta = mazo[base - j - 1] & ~BOCA_ABAJO
+            nuevo_h = _agregar(j, pila, (carta,), nuevo_h)
+            cambios[j] = pila + (carta,)
+        yield (_reemplazar(tablero, cambios), repartos + 1, completas, nuevo_h, nodo, 'M')
+
+
+def _corrida(pila):
+    """Devuelve el largo de la secuencia movible del tope de la pila."""
+    if not pila or pila[-1] & BOCA_ABAJO:
+        return 0
+    i = len(pila) - 1
+    while i > 0 and not pila[i - 1] & BOCA_ABAJO and (pila[i - 1] & BITS_VALOR) == (pila[i] & BITS_VALOR) + 1:
+        i -= 1
+    return len(pila) - i
+
+
+def _quitar(i, pila, cantidad, h):
+    """Saca cantidad cartas del tope de la pila i, dando vuelta la carta que
+    queda expuesta. Devuelve la pila resultante y el hash actualizado."""
+    for p in range(len(pila) - cantidad, len(pila)):
+        h ^= _ZOBRIST_CARTAS[i][p][pila[p]]
+    resto = pila[:-cantidad]
+    if resto and resto[-1] & BOCA_ABAJO:
+        p = len(resto) - 1
+        h ^= _ZOBRIST_CARTAS[i][p][resto[p]] ^ _ZOBRIST_CARTAS[i][p][resto[p] & ~BOCA_ABAJO]
+        resto = resto[:-1] + (resto[-1] & ~BOCA_ABAJO,)
+    return resto, h
+
+
+def _agregar(i, pila, bloque, h):
+    """Devuelve el hash actualizado al apilar bloque sobre la pila i."""
+    for k, carta in enumerate(bloque):
+        h ^= _ZOBRIST_CARTAS[i][len(pila) + k][carta]
+    return h
+
+
+def _reemplazar(tablero, cambios):
+    """Devuelve un tablero nuevo con las pilas de cambios reemplazadas. Las
+    pilas que no cambian se comparten con tablero."""
+    return tuple(cambios.get(i, pila) for i, pila in enumerate(tablero))
+
+
+def _hash(tablero, repartos, completas):
+    """Calcula el hash de Zobrist de un estado desde cero."""
+    h = _ZOBRIST_REPARTOS[repartos] ^ _ZOBRIST_COMPLETAS[completas]
+    for i, pila in enumerate(tablero):
+        h = _agregar(i, (), pila, h)
+    return h
+
+
+def _prioridad(tablero, repartos, completas):
+    """Heurística de la búsqueda: menor es más prometedor. Premia las
+    fundaciones completas, las cartas descubiertas, las secuencias ordenadas
+    y las pilas vacías."""
+    puntaje = completas * 100
+    for pila in tablero:
+        if not pila:
+            puntaje += 8
+            continue
+        for k, carta in enumerate(pila):
+            if carta & BOCA_ABAJO:
+                puntaje -= 5
+            elif k and not pila[k - 1] & BOCA_ABAJO and (pila[k - 1] & BITS_VALOR) == (carta & BITS_VALOR) + 1:
+                puntaje += 2
+    return -puntaje
+
+
+def _camino(nodo):
+    """Devuelve la lista de comandos desde la raíz hasta nodo."""
+    comandos = []
+    while nodo[4] is not None:
+        comandos.append(nodo[5])
+        nodo = nodo[4]
+    comandos.reverse()
+    return comandos
+
+
+def _letra(i):
+    return chr(ord('A') + i)
+
+
+# Entrada de la frontera: (prioridad, contador, nodo).
+_MEMORIA_ENTRADA = sys.getsizeof((0, 0, None)) + sys.getsizeof(1 << 40)
+
+
+def _memoria_nodo(hijo, padre):
+    """Estima los bytes que agrega a la búsqueda el nodo hijo de padre: el
+    nodo, su tablero, las pilas que no comparte con padre, su hash, su
+    comando y su entrada en la frontera. Los nodos no se liberan mientras
+    dura la búsqueda (los hijos guardan a su padre), así que la suma es una
+    cota del pico."""
+    tablero = hijo[0]
+    memoria = (sys.getsizeof(hijo) + sys.getsizeof(tablero) + sys.getsizeof(hijo[3]) +
+               sys.getsizeof(hijo[5]) + _MEMORIA_ENTRADA)
+    for pila, anterior in zip(tablero, padre[0]):
+        if pila is not anterior:
+            memoria += sys.getsizeof(pila)
+    return memoria
+
+
+def resolver_semilla(semilla, max_nodos=MAX_NODOS, max_memoria=None):
+    """Arma el reparto de Spider de la semilla (como lo hace main) y lo
+    resuelve. Devuelve un ResultadoSolver."""
+    random.seed(semilla)
+    mesa = Mesa()
+    SolitarioSpider(mesa).armar()
+    return resolver(mesa, max_nodos, max_memoria)
+
+
+def main():
+    """Uso: solver_spider.py SEMILLA_DESDE [SEMILLA_HASTA [MAX_NODOS [MAX_MEMORIA_MB]]]
+    Resuelve los repartos del rango de semillas e imprime un resultado por línea."""
+    if len(sys.argv) < 2:
+        print(main.__doc__)
+        return
+    desde = int(sys.argv[1])
+    hasta = int(sys.argv[2]) if len(sys.argv) > 2 else desde
+    max_nodos = int(sys.argv[3]) if len(sys.argv) > 3 else MAX_NODOS
+    max_memoria = int(sys.argv[4]) * 1024 * 1024 if len(sys.argv) > 4 else None
+    for semilla in range(desde, hasta + 1):
+        print(semilla, resolver_semilla(semilla, max_nodos, max_memoria))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from main import armar_juego
+from estado import EstadoMesa, Explorador
+from mesa import MAZO
+import contextlib, io, unittest
+
+
+class TestExplorador(unittest.TestCase):
+
+    def test_movimientos_segun_estado(self):
+        """Dos posiciones con las mismas pilas que difieren sólo en
+        recorridos_mazo: pedir el mazo acabado es legal en una y no en la
+        otra, aunque ninguna pila cambie al pasar de una a la otra."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            mesa, solitario = armar_juego('Reyerta', '#1')
+        explorador = Explorador(mesa, solitario)
+        inicial = explorador.inicial()
+        pilas = list(inicial.pilas)
+        pilas[mesa.pilas().index(mesa.mazo)] = b''
+        recorridos = solitario.ESTADO.index('recorridos_mazo')
+        posiciones = {}
+        for valor in (2, 3):
+            valores = list(inicial.valores)
+            valores[recorridos] = valor
+            posiciones[valor] = EstadoMesa(pilas, valores)
+
+        pedir = ((MAZO, 0),)
+        for valor in (2, 3, 2):
+            movimientos = explorador.movimientos(posiciones[valor])
+            self.assertEqual(pedir in movimientos, valor == 2)
+            for jugada in movimientos:
+                self.assertTrue(solitario.puede_jugar(jugada))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+from main import armar_juego
+from indice_repartos import resolver, GANABLE
+import contextlib, io, unittest
+
+REPARTOS = range(1, 9)
+MAX_NODOS = 2000
+
+
+def _armar(juego, numero):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return armar_juego(juego, '#{}'.format(numero))
+
+
+class TestResolver(unittest.TestCase):
+
+    def _verificar(self, juego):
+        """Las soluciones que encuentra resolver() ganan al jugarlas sobre el
+        mismo reparto recién armado, como lo jugaría alguien con -reparto.
+        Devuelve los solitarios ganados."""
+        ganados = []
+        for numero in REPARTOS:
+            mesa, solitario = _armar(juego, numero)
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultado, solucion, nodos = resolver(mesa, solitario, MAX_NODOS)
+            if resultado != GANABLE:
+                continue
+            mesa, solitario = _armar(juego, numero)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for jugada in solucion:
+                    solitario.jugar(jugada)
+            self.assertTrue(solitario.termino(), '{} #{}'.format(juego, numero))
+            ganados.append(solitario)
+        self.assertTrue(ganados, "Ningún reparto ganable de " + juego)
+        return ganados
+
+    def test_reyerta(self):
+        ganados = self._verificar('Reyerta')
+        # Las soluciones tienen que incluir rebarajadas para que la prueba
+        # sirva de algo.
+        self.assertTrue(any(solitario.recorridos_mazo > 1 for solitario in ganados))
+
+    def test_eliminador(self):
+        self._verificar('Eliminador')
+
+    def test_sin_reparto_numerado(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            mesa, solitario = armar_juego('Reyerta', 1)
+        self.assertRaises(ValueError, resolver, mesa, solitario)
+
+
+if __name__ == "__main__":
+    unittest.main()
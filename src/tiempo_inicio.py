@@ -0,0 +1,41 @@
+import argparse, os, statistics, subprocess, sys, time
+
+# Cada caso es el código que corre un proceso nuevo de Python.
+CASOS = [
+    ("intérprete solo", "pass"),
+    ("import main", "import main"),
+    ("import main + un solitario", "import main\nmain.SOLITARIOS['Eliminador']"),
+    # Lo que se importaba antes del registro perezoso.
+    ("import main + todos los módulos", "import main, solitario_ejemplo, solitario_eliminador, solitario_reyerta, solitario_spider"),
+    ("import main + listar (entry points)", "import main\nlist(main.SOLITARIOS)"),
+]
+REPETICIONES = 20
+
+
+def medir(codigo, repeticiones=REPETICIONES):
+    """Devuelve la lista de tiempos (en segundos) de lanzar repeticiones veces
+    un proceso de Python que ejecuta codigo desde este directorio."""
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', codigo], cwd=directorio, check=True)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque de procesos que importan el juego.")
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    args = parser.parse_args()
+
+    base = None
+    for nombre, codigo in CASOS:
+        tiempos = medir(codigo, args.repeticiones)
+        mediana, minimo = statistics.median(tiempos) * 1000, min(tiempos) * 1000
+        if base is None:
+            base = mediana
+        print("{:40} mediana {:6.1f} ms  mínimo {:6.1f} ms  ({:+.1f} ms sobre el intérprete)".format(nombre, mediana, minimo, mediana - base))
+
+if __name__ == "__main__":
+    main()